@@ -27,6 +27,8 @@ const HEADERS = [
 
 const PHONE_HEADER = 'Número telefónico';
 const OBSERVACIONES_FOLLOWUP_HEADER = 'Observaciones #2';
+// Acciones opcionales que los importadores pueden consultar con action=capacidades.
+const SUPPORTED_ACTIONS = ['telefonos', 'bulkinsert'];
 
 function doGet(e) {
   if (e && e.parameter) {
@@ -57,6 +59,14 @@ function doGet(e) {
       return handleObservationUpdate_(sheet, payload, params.callback);
     }
 
+    if (action === 'telefonos' || action === 'listartelefonos') {
+      return handlePhoneSnapshot_(params.callback);
+    }
+
+    if (action === 'capacidades' || action === 'capabilities') {
+      return buildResponse_({ success: true, acciones: SUPPORTED_ACTIONS }, params.callback);
+    }
+
     if (params.telefono) {
       return handleLookup_(e);
     }
@@ -101,29 +111,12 @@ function doPost(e) {
       return handleEstadoUpdate_(sheet, payload);
     }
 
-    const series = parseSeries_(payload.serieVehiculo);
-    const telefonoRaw = toSafeString_(payload.clienteTelefono);
+    if (normalizedAction === 'bulkinsert' || normalizedAction === 'insertarlote') {
+      return handleBulkInsert_(sheet, payload);
+    }
 
-    const row = [
-      new Date(),
-      toSafeString_(payload.fechaHora),
-      toSafeString_(payload.sede),
-      toSafeString_(payload.asesor),
-      toSafeString_(payload.fuente),
-      toSafeString_(payload.clienteNombre),
-      telefonoRaw,
-      toSafeString_(payload.clienteCedula),
-      toSafeString_(payload.necesidad),
-      toSafeString_(payload.tipoVehiculo),
-      toSafeString_(payload.anioModeloVehiculo),
-      series[0] || '',
-      series[1] || '',
-      series[2] || '',
-      toSafeString_(payload.presupuesto),
-      toSafeString_(payload.siguientePaso),
-      toSafeString_(payload.observaciones),
-      toSafeString_(payload.observaciones2)
-    ];
+    const telefonoRaw = toSafeString_(payload.clienteTelefono);
+    const row = buildRow_(payload, new Date());
 
     sheet.appendRow(row);
 
@@ -149,6 +142,67 @@ function doPost(e) {
   }
 }
 
+function buildRow_(payload, timestamp) {
+  const series = parseSeries_(payload.serieVehiculo);
+  return [
+    timestamp,
+    toSafeString_(payload.fechaHora),
+    toSafeString_(payload.sede),
+    toSafeString_(payload.asesor),
+    toSafeString_(payload.fuente),
+    toSafeString_(payload.clienteNombre),
+    toSafeString_(payload.clienteTelefono),
+    toSafeString_(payload.clienteCedula),
+    toSafeString_(payload.necesidad),
+    toSafeString_(payload.tipoVehiculo),
+    toSafeString_(payload.anioModeloVehiculo),
+    series[0] || '',
+    series[1] || '',
+    series[2] || '',
+    toSafeString_(payload.presupuesto),
+    toSafeString_(payload.siguientePaso),
+    toSafeString_(payload.observaciones),
+    toSafeString_(payload.observaciones2)
+  ];
+}
+
+/**
+ * Inserta varios registros (`payload.registros`) con una sola escritura
+ * `setValues` y devuelve el resultado de cada uno en el mismo orden.
+ */
+function handleBulkInsert_(sheet, payload) {
+  const registros = payload.registros;
+  if (!Array.isArray(registros)) {
+    return buildResponse_({ success: false, error: 'El lote debe incluir la lista "registros".' });
+  }
+
+  const timestamp = new Date();
+  const telefonoIndex = HEADERS.indexOf(PHONE_HEADER);
+  const rows = [];
+  const resultados = registros.map(registro => {
+    if (!registro || typeof registro !== 'object' || Array.isArray(registro)) {
+      return { success: false, error: 'Registro inválido' };
+    }
+    const row = buildRow_(registro, timestamp);
+    const sanitizedPhone = toSafeString_(registro.clienteTelefono).replace(/^'+/, '');
+    row[telefonoIndex] = sanitizedPhone ? "'" + sanitizedPhone : '';
+    rows.push(row);
+    return { success: true };
+  });
+
+  if (rows.length) {
+    const startRow = sheet.getLastRow() + 1;
+    sheet.getRange(startRow, telefonoIndex + 1, rows.length, 1).setNumberFormat('@');
+    sheet.getRange(startRow, 1, rows.length, HEADERS.length).setValues(rows);
+  }
+
+  return buildResponse_({
+    success: true,
+    message: `${rows.length} registros guardados`,
+    resultados: resultados
+  });
+}
+
 function handleLookup_(e) {
   const telefonoNormalizado = normalizeDigits_(e.parameter.telefono || '');
   const callback = e.parameter.callback;
@@ -188,6 +242,42 @@ function handleLookup_(e) {
   return buildResponse_({ success: false, error: 'Cliente no encontrado' }, callback);
 }
 
+/**
+ * Devuelve solo la columna de teléfonos (normalizados y sin repetir) para que
+ * los importadores verifiquen existencia en memoria con una sola lectura.
+ */
+function handlePhoneSnapshot_(callback) {
+  const sheet = getSheet_();
+  if (!sheet) {
+    return buildResponse_({ success: false, error: 'Hoja no encontrada' }, callback);
+  }
+
+  const lastRow = sheet.getLastRow();
+  const lastColumn = sheet.getLastColumn();
+  if (lastRow <= 1 || lastColumn === 0) {
+    return buildResponse_({ success: true, telefonos: [] }, callback);
+  }
+
+  const headers = sheet.getRange(1, 1, 1, lastColumn).getValues()[0];
+  const phoneIndex = headers.indexOf(PHONE_HEADER);
+  if (phoneIndex === -1) {
+    return buildResponse_({ success: false, error: 'La hoja no tiene columna de teléfono' }, callback);
+  }
+
+  const values = sheet.getRange(2, phoneIndex + 1, lastRow - 1, 1).getValues();
+  const seen = {};
+  const telefonos = [];
+  values.forEach(row => {
+    const telefono = normalizeDigits_(row[0]);
+    if (telefono && !seen[telefono]) {
+      seen[telefono] = true;
+      telefonos.push(telefono);
+    }
+  });
+
+  return buildResponse_({ success: true, telefonos: telefonos }, callback);
+}
+
 function buildResponse_(payload, callback) {
   const json = JSON.stringify(payload);
   const output = ContentService.createTextOutput();
@@ -0,0 +1,141 @@
+"""Read and write the Fasecolda valuation artefacts in their alternative formats.
+
+`fetch_bmw_fasecolda_values.py` always knew one layout: an indented JSON list
+of series with a `null` for every year without value. This module adds:
+
+* ``json-min``: minified JSON with sparse ``valores`` (only years with a value),
+  wrapped in ``{"formato": "fasecolda-sparse", "years": [...], "series": [...]}``
+  so the full year range can be restored.
+* ``msgpack``: the same sparse document encoded with MessagePack (requires the
+  optional ``msgpack`` package).
+* ``.gz`` / ``.br`` siblings of any artefact (``.br`` requires ``brotli``).
+
+`load_fasecolda_values` reads any of them back into the original structure:
+a list of series whose references carry the complete ``valores`` mapping.
+"""
+
+from __future__ import annotations
+
+import gzip
+import importlib
+import json
+from pathlib import Path
+from types import ModuleType
+from typing import Dict, Iterable, List, Sequence
+
+SPARSE_FORMAT = "fasecolda-sparse"
+SPARSE_VERSION = 1
+
+OUTPUT_FORMATS = ("json", "json-min", "msgpack")
+COMPRESSIONS = ("gz", "br")
+
+OPTIONAL_MODULES = {"msgpack": "msgpack", "br": "brotli"}
+
+
+def require_module(name: str) -> ModuleType:
+    """Import an optional dependency or explain how to install it."""
+    try:
+        return importlib.import_module(name)
+    except ImportError as exc:
+        raise RuntimeError(
+            f"Se requiere el paquete opcional '{name}' (pip install {name})"
+        ) from exc
+
+
+def check_dependencies(formats: Iterable[str], compressions: Iterable[str]) -> None:
+    """Fail early, before a long download, if a requested format cannot be written."""
+    for option in (*formats, *compressions):
+        module = OPTIONAL_MODULES.get(option)
+        if module:
+            require_module(module)
+
+
+def artifact_path(json_output: Path, fmt: str) -> Path:
+    """Return where `fmt` is written next to the main JSON output."""
+    if fmt == "json":
+        return json_output
+    if fmt == "json-min":
+        return json_output.with_suffix(".min.json")
+    if fmt == "msgpack":
+        return json_output.with_suffix(".msgpack")
+    raise ValueError(f"Formato no soportado: {fmt}")
+
+
+def sparse_document(series: Sequence[dict], years: Sequence[str]) -> dict:
+    """Wrap serialised series whose `valores` only keep years with a value."""
+    return {
+        "formato": SPARSE_FORMAT,
+        "version": SPARSE_VERSION,
+        "years": list(years),
+        "series": list(series),
+    }
+
+
+def encode(document: object, fmt: str) -> bytes:
+    if fmt == "json":
+        return json.dumps(document, indent=2, ensure_ascii=False).encode("utf-8")
+    if fmt == "json-min":
+        return json.dumps(document, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if fmt == "msgpack":
+        return require_module("msgpack").packb(document, use_bin_type=True)
+    raise ValueError(f"Formato no soportado: {fmt}")
+
+
+def compress(data: bytes, kind: str) -> bytes:
+    if kind == "gz":
+        # mtime=0 keeps the output reproducible between runs with the same data.
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    if kind == "br":
+        return require_module("brotli").compress(data)
+    raise ValueError(f"Compresión no soportada: {kind}")
+
+
+def decompress(data: bytes, kind: str) -> bytes:
+    if kind == "gz":
+        return gzip.decompress(data)
+    if kind == "br":
+        return require_module("brotli").decompress(data)
+    raise ValueError(f"Compresión no soportada: {kind}")
+
+
+def write_artifact(data: bytes, target: Path, compressions: Iterable[str] = ()) -> List[Path]:
+    """Write `data` to `target` plus one precompressed sibling per compression."""
+    written = [target]
+    target.write_bytes(data)
+    for kind in compressions:
+        sibling = target.with_name(f"{target.name}.{kind}")
+        sibling.write_bytes(compress(data, kind))
+        written.append(sibling)
+    return written
+
+
+def expand_sparse(document: dict) -> List[dict]:
+    """Restore the full `valores` mapping (None for missing years) of a sparse document."""
+    if document.get("version") != SPARSE_VERSION:
+        raise ValueError(f"Versión de artefacto no soportada: {document.get('version')}")
+    years = document["years"]
+    series = document["series"]
+    for entry in series:
+        for ref in entry["referencias"]:
+            values: Dict[str, float | None] = ref["valores"]
+            ref["valores"] = {year: values.get(year) for year in years}
+    return series
+
+
+def load_fasecolda_values(path: Path | str) -> List[dict]:
+    """Load any Fasecolda artefact (json, json-min, msgpack, optionally .gz/.br)."""
+    path = Path(path)
+    data = path.read_bytes()
+    suffixes = [suffix.lstrip(".") for suffix in path.suffixes]
+    if suffixes and suffixes[-1] in COMPRESSIONS:
+        data = decompress(data, suffixes.pop())
+    if suffixes and suffixes[-1] == "msgpack":
+        document = require_module("msgpack").unpackb(data, raw=False)
+    else:
+        document = json.loads(data.decode("utf-8"))
+
+    if isinstance(document, list):
+        return document
+    if isinstance(document, dict) and document.get("formato") == SPARSE_FORMAT:
+        return expand_sparse(document)
+    raise ValueError(f"{path} no parece un artefacto de valores Fasecolda")
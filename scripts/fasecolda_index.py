@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""In-memory query index over the Fasecolda valuation artefact.
+
+Loads `bmw_fasecolda_values.json` (or any format understood by
+`fasecolda_artifacts.load_fasecolda_values`) once and answers, without scanning
+the whole list:
+
+* `get(codigo)`: O(1) lookup by Fasecolda code.
+* `by_serie(serie)` / `by_categoria(categoria)`: dict lookups (case and
+  punctuation insensitive).
+* `search("x3 xdrive")`: references whose `referencia`/serie contain every
+  token; a query token that is not a full word matches as a prefix.
+* `value_for_year(codigo, "2018")`: USADO value for that year, falling back to
+  the nearest year with a published value.
+
+The built index is pickled under `tmp/` keyed by the artefact's mtime and size,
+so later processes skip JSON parsing and index building.
+
+Usage::
+
+    python scripts/fasecolda_index.py --codigo 00601234 --year 2018
+    python scripts/fasecolda_index.py --buscar "x3 xdrive30e"
+    python scripts/fasecolda_index.py --benchmark 10000
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import hashlib
+import pickle
+import random
+import re
+import sys
+import time
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence
+
+from fasecolda_artifacts import load_fasecolda_values
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_DATA_PATH = ROOT_DIR / "bmw_fasecolda_values.json"
+DEFAULT_CACHE_DIR = ROOT_DIR / "tmp"
+INDEX_VERSION = 1
+
+TOKEN_PATTERN = re.compile(r"[A-Z0-9]+")
+
+
+def normalize_text(value: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", value or "")
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).upper()
+
+
+def normalize_key(value: str) -> str:
+    return "".join(char for char in normalize_text(value) if char.isalnum())
+
+
+def tokenize(value: str) -> List[str]:
+    return TOKEN_PATTERN.findall(normalize_text(value))
+
+
+@dataclass(frozen=True)
+class FasecoldaReference:
+    codigo: str
+    referencia: str
+    serie: str
+    categoria: str
+    tipologia: str
+    clase: str
+    valores: Dict[str, float]  # only years with a published value
+
+    def as_tuple(self) -> tuple:
+        return (
+            self.codigo,
+            self.referencia,
+            self.serie,
+            self.categoria,
+            self.tipologia,
+            self.clase,
+            self.valores,
+        )
+
+
+class FasecoldaIndex:
+    def __init__(self, references: Sequence[FasecoldaReference], years: Sequence[str]) -> None:
+        self.references = list(references)
+        self.years = list(years)
+        self.by_codigo: Dict[str, FasecoldaReference] = {}
+        self.serie_index: Dict[str, List[int]] = {}
+        self.categoria_index: Dict[str, List[int]] = {}
+        self.token_postings: Dict[str, List[int]] = {}
+        for position, reference in enumerate(self.references):
+            self.by_codigo.setdefault(reference.codigo, reference)
+            self.serie_index.setdefault(normalize_key(reference.serie), []).append(position)
+            self.categoria_index.setdefault(normalize_key(reference.categoria), []).append(
+                position
+            )
+            for token in set(tokenize(f"{reference.serie} {reference.referencia}")):
+                self.token_postings.setdefault(token, []).append(position)
+        self.sorted_tokens = sorted(self.token_postings)
+
+    @classmethod
+    def from_series(cls, series: Iterable[dict]) -> "FasecoldaIndex":
+        references: List[FasecoldaReference] = []
+        years: List[str] = []
+        for entry in series:
+            for ref in entry.get("referencias", []):
+                valores = ref.get("valores") or {}
+                if not years and valores:
+                    years = list(valores)
+                references.append(
+                    FasecoldaReference(
+                        codigo=ref.get("codigo", ""),
+                        referencia=ref.get("referencia", ""),
+                        serie=entry.get("serie", ""),
+                        categoria=entry.get("categoria", ""),
+                        tipologia=ref.get("tipologia", ""),
+                        clase=ref.get("clase", ""),
+                        valores={
+                            year: value for year, value in valores.items() if value is not None
+                        },
+                    )
+                )
+        return cls(references, years)
+
+    @classmethod
+    def load(
+        cls, path: Path | str = DEFAULT_DATA_PATH, cache_dir: Path | None = DEFAULT_CACHE_DIR
+    ) -> "FasecoldaIndex":
+        """Load the artefact, reusing the pickled index while its mtime/size match."""
+        path = Path(path).resolve()
+        stat = path.stat()
+        cache_key = (INDEX_VERSION, str(path), stat.st_mtime_ns, stat.st_size)
+        cache_path = None
+        if cache_dir is not None:
+            digest = hashlib.sha1(str(path).encode("utf-8")).hexdigest()[:12]
+            cache_path = Path(cache_dir) / f"fasecolda_index_{digest}.pickle"
+            try:
+                with cache_path.open("rb") as handle:
+                    cached = pickle.load(handle)
+                if cached.get("key") == cache_key:
+                    return cls._from_state(cached)
+            except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+                pass
+
+        index = cls.from_series(load_fasecolda_values(path))
+        if cache_path is not None:
+            try:
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+                with tmp_path.open("wb") as handle:
+                    pickle.dump(index._state(cache_key), handle, protocol=pickle.HIGHEST_PROTOCOL)
+                tmp_path.replace(cache_path)
+            except OSError as exc:
+                print(f"[WARN] No se pudo guardar la caché del índice: {exc}", file=sys.stderr)
+        return index
+
+    def _state(self, key: tuple) -> dict:
+        # Only builtins are pickled so the cache loads regardless of how this
+        # module was imported (script, `__main__`, or another scripts/ module).
+        return {
+            "key": key,
+            "years": self.years,
+            "rows": [reference.as_tuple() for reference in self.references],
+            "serie_index": self.serie_index,
+            "categoria_index": self.categoria_index,
+            "token_postings": self.token_postings,
+        }
+
+    @classmethod
+    def _from_state(cls, state: dict) -> "FasecoldaIndex":
+        index = cls.__new__(cls)
+        index.references = [FasecoldaReference(*row) for row in state["rows"]]
+        index.years = state["years"]
+        index.by_codigo = {}
+        for reference in index.references:
+            index.by_codigo.setdefault(reference.codigo, reference)
+        index.serie_index = state["serie_index"]
+        index.categoria_index = state["categoria_index"]
+        index.token_postings = state["token_postings"]
+        index.sorted_tokens = sorted(index.token_postings)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.references)
+
+    def get(self, codigo: str) -> FasecoldaReference | None:
+        return self.by_codigo.get(codigo)
+
+    def by_serie(self, serie: str) -> List[FasecoldaReference]:
+        return [self.references[i] for i in self.serie_index.get(normalize_key(serie), [])]
+
+    def by_categoria(self, categoria: str) -> List[FasecoldaReference]:
+        return [
+            self.references[i] for i in self.categoria_index.get(normalize_key(categoria), [])
+        ]
+
+    def _postings_for(self, token: str) -> set[int]:
+        exact = self.token_postings.get(token)
+        if exact is not None:
+            return set(exact)
+        # Partial word: union of every indexed token starting with it.
+        positions: set[int] = set()
+        start = bisect.bisect_left(self.sorted_tokens, token)
+        for indexed in self.sorted_tokens[start:]:
+            if not indexed.startswith(token):
+                break
+            positions.update(self.token_postings[indexed])
+        return positions
+
+    def search(self, text: str, limit: int | None = None) -> List[FasecoldaReference]:
+        """References matching every token of `text`, in artefact order."""
+        tokens = sorted(set(tokenize(text)), key=len, reverse=True)
+        if not tokens:
+            return []
+        matches: set[int] | None = None
+        for token in tokens:
+            postings = self._postings_for(token)
+            matches = postings if matches is None else matches & postings
+            if not matches:
+                return []
+        positions = sorted(matches or ())
+        if limit is not None:
+            positions = positions[:limit]
+        return [self.references[i] for i in positions]
+
+    def value_for_year(
+        self, codigo: str, year: str | int, nearest: bool = True
+    ) -> tuple[str, float] | None:
+        """Return `(year_used, value)`; ties between two nearest years favour the newer one."""
+        reference = self.by_codigo.get(codigo)
+        if reference is None or not reference.valores:
+            return None
+        year = str(year)
+        value = reference.valores.get(year)
+        if value is not None:
+            return year, value
+        if not nearest:
+            return None
+        try:
+            target = int(year)
+        except ValueError:
+            return None
+        best_year = min(reference.valores, key=lambda y: (abs(int(y) - target), -int(y)))
+        return best_year, reference.valores[best_year]
+
+
+def run_benchmark(path: Path, queries: int, seed: int = 87) -> None:
+    """Time `queries` random lookups through the index vs a linear scan of the JSON list."""
+    started = time.perf_counter()
+    series = load_fasecolda_values(path)
+    parse_seconds = time.perf_counter() - started
+    cold_started = time.perf_counter()
+    FasecoldaIndex.from_series(series)
+    build_seconds = time.perf_counter() - cold_started
+    FasecoldaIndex.load(path)  # make sure the pickle is fresh
+    warm_started = time.perf_counter()
+    index = FasecoldaIndex.load(path)
+    warm_seconds = time.perf_counter() - warm_started
+    print(
+        f"Referencias: {len(index)} | JSON {parse_seconds * 1000:.1f} ms + índice "
+        f"{build_seconds * 1000:.1f} ms | caché pickle {warm_seconds * 1000:.1f} ms"
+    )
+
+    rng = random.Random(seed)
+    references = index.references
+    workload = []
+    for _ in range(queries):
+        reference = rng.choice(references)
+        kind = rng.choice(("codigo", "serie", "buscar", "valor"))
+        if kind == "buscar":
+            words = tokenize(reference.referencia) or [reference.codigo]
+            argument = " ".join(rng.sample(words, min(2, len(words))))
+        elif kind == "serie":
+            argument = reference.serie
+        else:
+            argument = reference.codigo
+        workload.append((kind, argument, str(rng.randint(2008, 2027))))
+
+    def linear(kind: str, argument: str, year: str) -> object:
+        if kind in ("codigo", "valor"):
+            for entry in series:
+                for ref in entry["referencias"]:
+                    if ref["codigo"] == argument:
+                        return ref["valores"].get(year)
+            return None
+        if kind == "serie":
+            return [entry for entry in series if entry["serie"].upper() == argument.upper()]
+        tokens = tokenize(argument)
+        return [
+            ref
+            for entry in series
+            for ref in entry["referencias"]
+            if all(
+                token in normalize_text(f"{entry['serie']} {ref['referencia']}")
+                for token in tokens
+            )
+        ]
+
+    def indexed(kind: str, argument: str, year: str) -> object:
+        if kind == "codigo":
+            return index.get(argument)
+        if kind == "valor":
+            return index.value_for_year(argument, year)
+        if kind == "serie":
+            return index.by_serie(argument)
+        return index.search(argument)
+
+    for label, handler in (("índice", indexed), ("recorrido lineal", linear)):
+        started = time.perf_counter()
+        for kind, argument, year in workload:
+            handler(kind, argument, year)
+        elapsed = time.perf_counter() - started
+        print(
+            f"{label}: {queries} consultas en {elapsed:.3f} s "
+            f"({elapsed / queries * 1e6:.1f} µs/consulta)"
+        )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--data",
+        type=Path,
+        default=DEFAULT_DATA_PATH,
+        help="Artefacto Fasecolda a indexar (json, json-min o msgpack, con o sin .gz/.br)",
+    )
+    parser.add_argument("--codigo", help="Muestra la referencia con este código Fasecolda")
+    parser.add_argument(
+        "--year",
+        help="Año a consultar junto con --codigo (usa el más cercano si no hay dato)",
+    )
+    parser.add_argument(
+        "--buscar",
+        help="Texto a buscar en serie/referencia (todas las palabras, admite prefijos)",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=20,
+        help="Máximo de resultados de --buscar (por defecto 20)",
+    )
+    parser.add_argument(
+        "--benchmark",
+        type=int,
+        metavar="N",
+        help="Ejecuta N consultas aleatorias y las compara con un recorrido lineal",
+    )
+    return parser.parse_args()
+
+
+def describe(reference: FasecoldaReference) -> str:
+    return " | ".join(
+        (reference.codigo, reference.categoria, reference.serie, reference.referencia)
+    )
+
+
+def main() -> int:
+    args = parse_args()
+    if args.benchmark:
+        run_benchmark(args.data, args.benchmark)
+        return 0
+
+    index = FasecoldaIndex.load(args.data)
+    if args.codigo:
+        reference = index.get(args.codigo)
+        if reference is None:
+            print(f"Código no encontrado: {args.codigo}")
+            return 1
+        print(describe(reference))
+        if args.year:
+            found = index.value_for_year(reference.codigo, args.year)
+            if found is None:
+                print("Sin valores publicados")
+            else:
+                year_used, value = found
+                note = "" if year_used == str(args.year) else f" (año más cercano: {year_used})"
+                print(f"Valor {args.year}: {value:.1f}{note}")
+        return 0
+    if args.buscar:
+        for reference in index.search(args.buscar, limit=args.limit):
+            print(describe(reference))
+        return 0
+    print(f"Referencias indexadas: {len(index)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
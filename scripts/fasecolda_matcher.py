@@ -0,0 +1,211 @@
+"""Fuzzy matcher from free-text vehicle descriptions to Fasecolda references.
+
+Leads describe the vehicle as free text ("X3 xDrive30e 2021", "serie 3 320i").
+`FasecoldaMatcher` indexes every `referencia` of a `FasecoldaIndex` by:
+
+* whole words and their letter/digit pieces ("XDRIVE30E" -> "XDRIVE", "30"),
+* character trigrams of each word, to tolerate typos and missing spaces,
+
+each weighted by inverse document frequency. A query only touches the posting
+lists of its own features (features present in more than a quarter of the
+catalogue are scored but never used to generate candidates), so matching cost
+does not grow with a full scan of the catalogue.
+
+The score is the share of the query's feature weight found in the reference,
+minus a penalty that grows with the distance between the requested year and
+the reference's nearest valued year; ties prefer the shortest (most generic)
+reference. A reference that lacks the query's model word ("X1", "320I") is
+never a candidate, however many trim words ("SDRIVE20I") it shares.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Container, Dict, FrozenSet, List
+
+from fasecolda_index import DEFAULT_DATA_PATH, FasecoldaIndex, tokenize
+
+MIN_SCORE = 0.6
+TRIGRAM_WEIGHT = 0.35
+MAX_CANDIDATE_DF_RATIO = 0.25
+YEAR_DISTANCE_PENALTY = 0.02  # per year between the lead and the nearest valued year
+MAX_YEAR_PENALTY = 0.1
+NO_VALUES_PENALTY = 0.1
+
+WORD_PIECE_PATTERN = re.compile(r"[A-Z]+|\d+")
+# Words leads use to introduce the model that never appear in a referencia.
+STOPWORDS = frozenset({"SERIE", "SERIES", "MODELO", "LINEA", "VERSION", "DE", "LA", "EL"})
+
+
+def features(text: str, known: Container[str] | None = None) -> FrozenSet[str]:
+    """Word, word-piece and trigram features of `text`.
+
+    The letter/digit pieces of a compound word are always features, next to
+    the word itself. With `known` (query side), a compound word the catalogue
+    never saw is left to its pieces: "S1000RR" should not be penalised against
+    "S 1000 RR".
+    """
+    result = set()
+    for token in tokenize(text):
+        # "serie 3" -> the series digit is already part of the model ("320i").
+        if token in STOPWORDS or (len(token) == 1 and token.isdigit()):
+            continue
+        pieces = WORD_PIECE_PATTERN.findall(token)
+        words = [token]
+        if len(pieces) > 1:
+            result.update(f"w:{piece}" for piece in pieces if len(piece) >= 2)
+            if known is not None and f"w:{token}" not in known:
+                words = pieces
+        for word in words:
+            result.add(f"w:{word}")
+            padded = f" {word} "
+            result.update(f"g:{padded[i : i + 3]}" for i in range(len(padded) - 2))
+    return frozenset(result)
+
+
+def model_word(text: str) -> str | None:
+    """First word mixing letters and digits ("X1", "320I", "S1000RR"): the model asked for."""
+    for token in tokenize(text):
+        if token in STOPWORDS:
+            continue
+        if any(char.isdigit() for char in token) and any(char.isalpha() for char in token):
+            return token
+    return None
+
+
+def has_model(reference_features: FrozenSet[str], word: str) -> bool:
+    """`word` is in the reference, whole or as all of its pieces ("S1000RR" ~ "S 1000 RR")."""
+    if f"w:{word}" in reference_features:
+        return True
+    pieces = WORD_PIECE_PATTERN.findall(word)
+    return len(pieces) > 1 and all(f"w:{piece}" in reference_features for piece in pieces)
+
+
+@dataclass(frozen=True)
+class FasecoldaMatch:
+    codigo: str
+    referencia: str
+    score: float
+    anio: str | None
+    valor: float | None
+    aproximado: bool
+
+
+class FasecoldaMatcher:
+    def __init__(self, index: FasecoldaIndex) -> None:
+        self.index = index
+        references = index.references
+        self.reference_features: List[FrozenSet[str]] = [
+            features(reference.referencia) for reference in references
+        ]
+        document_frequency: Counter[str] = Counter()
+        for reference_features in self.reference_features:
+            document_frequency.update(reference_features)
+
+        total = max(len(references), 1)
+        # Query features the catalogue never saw still count against the score.
+        self.unknown_weight = math.log(1 + total)
+        self.weights: Dict[str, float] = {}
+        self.postings: Dict[str, List[int]] = {}
+        for feature, frequency in document_frequency.items():
+            weight = math.log(1 + total / frequency)
+            if feature.startswith("g:"):
+                weight *= TRIGRAM_WEIGHT
+            self.weights[feature] = weight
+        max_df = max(int(total * MAX_CANDIDATE_DF_RATIO), 1)
+        for position, reference_features in enumerate(self.reference_features):
+            for feature in reference_features:
+                if document_frequency[feature] <= max_df:
+                    self.postings.setdefault(feature, []).append(position)
+        self.lengths = [len(reference_features) for reference_features in self.reference_features]
+
+    def _weight(self, feature: str) -> float:
+        weight = self.weights.get(feature)
+        if weight is not None:
+            return weight
+        if feature.startswith("g:"):
+            return self.unknown_weight * TRIGRAM_WEIGHT
+        return self.unknown_weight
+
+    @classmethod
+    def load(cls, path: Path | str = DEFAULT_DATA_PATH) -> "FasecoldaMatcher":
+        return cls(FasecoldaIndex.load(path))
+
+    def match(
+        self,
+        text: str,
+        year: str | None = None,
+        brand: str = "",
+        moto: bool | None = None,
+    ) -> FasecoldaMatch | None:
+        """Best reference for `text`, or None below `MIN_SCORE`.
+
+        `brand` must appear in the reference when the catalogue knows it (and the
+        lead is rejected when it does not); `moto` restricts to MOTOS or to the
+        other categorías.
+        """
+        brand_features = [f"w:{token}" for token in tokenize(brand)]
+        if brand_features and brand_features[0] not in self.weights:
+            return None
+        query = features(text, self.weights) - set(brand_features)
+        model = model_word(text)
+        query_weight = sum(self._weight(feature) for feature in query)
+        if query_weight <= 0:
+            return None
+
+        scores: Dict[int, float] = {}
+        common: List[str] = []
+        for feature in query:
+            weight = self.weights.get(feature)
+            if weight is None:
+                continue
+            postings = self.postings.get(feature)
+            if postings is None:
+                common.append(feature)
+                continue
+            for position in postings:
+                scores[position] = scores.get(position, 0.0) + weight
+        if not scores:
+            return None
+
+        references = self.index.references
+        best: tuple | None = None
+        for position, score in scores.items():
+            reference_features = self.reference_features[position]
+            if brand_features and brand_features[0] not in reference_features:
+                continue
+            if model and not has_model(reference_features, model):
+                continue
+            reference = references[position]
+            if moto is not None and ("MOTO" in reference.categoria.upper()) != moto:
+                continue
+            for feature in common:
+                if feature in reference_features:
+                    score += self.weights[feature]
+            coverage = score / query_weight
+            if not reference.valores:
+                coverage -= NO_VALUES_PENALTY
+            elif year and year.isdigit():
+                distance = min(abs(int(valued) - int(year)) for valued in reference.valores)
+                coverage -= min(distance * YEAR_DISTANCE_PENALTY, MAX_YEAR_PENALTY)
+            key = (coverage, -self.lengths[position], -position)
+            if best is None or key > best[0]:
+                best = (key, position)
+
+        if best is None or best[0][0] < MIN_SCORE:
+            return None
+        reference = references[best[1]]
+        found = self.index.value_for_year(reference.codigo, year) if year else None
+        anio, valor = found if found else (None, None)
+        return FasecoldaMatch(
+            codigo=reference.codigo,
+            referencia=reference.referencia,
+            score=round(min(best[0][0], 1.0), 3),
+            anio=anio,
+            valor=valor,
+            aproximado=anio is not None and anio != year,
+        )
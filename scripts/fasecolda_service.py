@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""Local HTTP service for Fasecolda valuations backed by the precomputed artefact.
+
+Serves the data of `bmw_fasecolda_values.json` (or any artefact readable by
+`fasecolda_artifacts`) from a `FasecoldaIndex`, so quote lookups do not pay the
+latency of the live Fasecolda API:
+
+* ``GET /valor?codigo=00601234&anio=2018``: USADO value for that year, falling
+  back to the nearest year with data (``"aproximado": true``).
+* ``GET /buscar?q=x3 xdrive&limite=20``: references matching every word.
+* ``GET /salud``: size of the loaded index and the artefact it came from.
+
+Responses are memoised in an LRU cache per loaded index. Every
+`--reload-interval` seconds a request checks the artefact's mtime/size; when it
+changed, the index is rebuilt and the cache starts empty.
+
+Usage::
+
+    python scripts/fasecolda_service.py --port 8787
+    python scripts/fasecolda_service.py --benchmark 20000 --clients 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import random
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+from urllib.parse import parse_qs, quote, urlsplit
+
+from fasecolda_index import DEFAULT_DATA_PATH, FasecoldaIndex, tokenize
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8787
+DEFAULT_CACHE_SIZE = 4096
+DEFAULT_RELOAD_INTERVAL = 2.0
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 200
+
+Response = Tuple[int, bytes]
+
+
+def encode_json(status: int, payload: object) -> Response:
+    return status, json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+@dataclass
+class LoadedIndex:
+    index: FasecoldaIndex
+    signature: Tuple[int, int]
+    loaded_at: float
+    valor: Callable[[str, str], Response]
+    buscar: Callable[[str, int], Response]
+
+
+class IndexHolder:
+    """Current index plus its response caches; swapped atomically on reload."""
+
+    def __init__(self, path: Path, cache_size: int, reload_interval: float) -> None:
+        self.path = path
+        self.cache_size = cache_size
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+        self.reloads = 0
+        self._loaded = self._load()
+
+    def _signature(self) -> Tuple[int, int]:
+        stat = self.path.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self) -> LoadedIndex:
+        signature = self._signature()
+        index = FasecoldaIndex.load(self.path)
+
+        @lru_cache(maxsize=self.cache_size)
+        def valor(codigo: str, anio: str) -> Response:
+            reference = index.get(codigo)
+            if reference is None:
+                return encode_json(404, {"error": f"Código no encontrado: {codigo}"})
+            found = index.value_for_year(codigo, anio)
+            anio_usado, valor_encontrado = found if found else (None, None)
+            return encode_json(
+                200,
+                {
+                    "codigo": reference.codigo,
+                    "referencia": reference.referencia,
+                    "serie": reference.serie,
+                    "categoria": reference.categoria,
+                    "anio_solicitado": anio,
+                    "anio": anio_usado,
+                    "valor": valor_encontrado,
+                    "aproximado": anio_usado is not None and anio_usado != anio,
+                },
+            )
+
+        @lru_cache(maxsize=self.cache_size)
+        def buscar(query: str, limite: int) -> Response:
+            matches = index.search(query)
+            return encode_json(
+                200,
+                {
+                    "q": query,
+                    "total": len(matches),
+                    "resultados": [
+                        {
+                            "codigo": reference.codigo,
+                            "referencia": reference.referencia,
+                            "serie": reference.serie,
+                            "categoria": reference.categoria,
+                            "tipologia": reference.tipologia,
+                            "clase": reference.clase,
+                        }
+                        for reference in matches[:limite]
+                    ],
+                },
+            )
+
+        return LoadedIndex(index, signature, time.time(), valor, buscar)
+
+    def current(self) -> LoadedIndex:
+        now = time.monotonic()
+        if now < self._next_check:
+            return self._loaded
+        with self._lock:
+            if now < self._next_check:
+                return self._loaded
+            self._next_check = now + self.reload_interval
+            try:
+                changed = self._signature() != self._loaded.signature
+            except OSError:
+                changed = False  # keep serving while the file is being replaced
+            if changed:
+                try:
+                    self._loaded = self._load()
+                    self.reloads += 1
+                    print(
+                        f"Índice recargado: {len(self._loaded.index)} referencias",
+                        file=sys.stderr,
+                    )
+                except (OSError, ValueError) as exc:
+                    print(f"[WARN] No se pudo recargar {self.path}: {exc}", file=sys.stderr)
+            return self._loaded
+
+
+def handle_request(holder: IndexHolder, target: str) -> Response:
+    parts = urlsplit(target)
+    params = parse_qs(parts.query)
+
+    def param(name: str) -> str:
+        return (params.get(name) or [""])[0].strip()
+
+    loaded = holder.current()
+    if parts.path == "/valor":
+        codigo, anio = param("codigo"), param("anio")
+        if not codigo or not anio:
+            return encode_json(400, {"error": "Parámetros requeridos: codigo y anio"})
+        return loaded.valor(codigo, anio)
+    if parts.path == "/buscar":
+        query = " ".join(tokenize(param("q")))
+        if not query:
+            return encode_json(400, {"error": "Parámetro requerido: q"})
+        try:
+            limite = int(param("limite") or DEFAULT_SEARCH_LIMIT)
+        except ValueError:
+            return encode_json(400, {"error": "limite debe ser un entero"})
+        return loaded.buscar(query, min(max(limite, 1), MAX_SEARCH_LIMIT))
+    if parts.path == "/salud":
+        return encode_json(
+            200,
+            {
+                "referencias": len(loaded.index),
+                "archivo": str(holder.path),
+                "cargado": time.strftime(
+                    "%Y-%m-%dT%H:%M:%S", time.localtime(loaded.loaded_at)
+                ),
+                "recargas": holder.reloads,
+            },
+        )
+    return encode_json(404, {"error": f"Ruta no encontrada: {parts.path}"})
+
+
+def make_handler(holder: IndexHolder) -> type[BaseHTTPRequestHandler]:
+    class FasecoldaHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive for repeated lookups
+        server_version = "FasecoldaService/1.0"
+        # Headers and body go out in two writes; without TCP_NODELAY every
+        # keep-alive response waits for the client's delayed ACK (~40 ms).
+        disable_nagle_algorithm = True
+
+        def do_GET(self) -> None:  # noqa: N802 - http.server naming
+            status, body = handle_request(holder, self.path)
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: object) -> None:
+            pass
+
+    return FasecoldaHandler
+
+
+def make_server(holder: IndexHolder, host: str, port: int) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), make_handler(holder))
+    server.daemon_threads = True
+    return server
+
+
+def run_benchmark(
+    holder: IndexHolder, requests_total: int, clients: int, seed: int = 87
+) -> None:
+    """Start the service on an ephemeral port and hammer it with keep-alive clients."""
+    server = make_server(holder, DEFAULT_HOST, 0)
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    rng = random.Random(seed)
+    references = holder.current().index.references
+    paths: List[str] = []
+    for _ in range(requests_total):
+        reference = rng.choice(references)
+        if rng.random() < 0.7:
+            paths.append(f"/valor?codigo={reference.codigo}&anio={rng.randint(2008, 2027)}")
+        else:
+            words = tokenize(reference.referencia) or [reference.codigo]
+            query = " ".join(rng.sample(words, min(2, len(words))))
+            paths.append(f"/buscar?q={quote(query)}")
+
+    def client(share: List[str], latencies: List[float], statuses: Dict[int, int]) -> None:
+        # `statuses` is private to this client; `latencies` is shared (list.append is atomic).
+        connection = http.client.HTTPConnection(DEFAULT_HOST, port, timeout=30)
+        for path in share:
+            started = time.perf_counter()
+            connection.request("GET", path)
+            response = connection.getresponse()
+            response.read()
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status] = statuses.get(response.status, 0) + 1
+        connection.close()
+
+    try:
+        for label in ("caché fría", "caché caliente"):
+            latencies: List[float] = []
+            per_client: List[Dict[int, int]] = [{} for _ in range(clients)]
+            threads = [
+                threading.Thread(
+                    target=client, args=(paths[i::clients], latencies, per_client[i])
+                )
+                for i in range(clients)
+            ]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+            latencies.sort()
+            statuses: Dict[int, int] = {}
+            for counts in per_client:
+                for status, count in counts.items():
+                    statuses[status] = statuses.get(status, 0) + count
+            p50 = latencies[len(latencies) // 2] * 1000
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+            print(
+                f"{label}: {requests_total} solicitudes con {clients} clientes en {elapsed:.2f} s "
+                f"-> {requests_total / elapsed:.0f} req/s | p50 {p50:.2f} ms | p99 {p99:.2f} ms "
+                f"| estados {dict(sorted(statuses.items()))}"
+            )
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--data",
+        type=Path,
+        default=DEFAULT_DATA_PATH,
+        help="Artefacto Fasecolda a servir (por defecto bmw_fasecolda_values.json)",
+    )
+    parser.add_argument(
+        "--host", default=DEFAULT_HOST, help=f"Interfaz (por defecto {DEFAULT_HOST})"
+    )
+    parser.add_argument(
+        "--port", type=int, default=DEFAULT_PORT, help=f"Puerto (por defecto {DEFAULT_PORT})"
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_CACHE_SIZE,
+        help=f"Respuestas memorizadas por ruta (LRU, por defecto {DEFAULT_CACHE_SIZE})",
+    )
+    parser.add_argument(
+        "--reload-interval",
+        type=float,
+        default=DEFAULT_RELOAD_INTERVAL,
+        help=(
+            "Segundos entre revisiones de cambios del artefacto para recargarlo "
+            f"(por defecto {DEFAULT_RELOAD_INTERVAL:g})"
+        ),
+    )
+    parser.add_argument(
+        "--benchmark",
+        type=int,
+        metavar="N",
+        help="Levanta el servicio en un puerto libre y mide N solicitudes desde clientes locales",
+    )
+    parser.add_argument(
+        "--clients",
+        type=int,
+        default=4,
+        help="Clientes concurrentes del benchmark (por defecto 4)",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    holder = IndexHolder(args.data.resolve(), max(args.cache_size, 0), args.reload_interval)
+    if args.benchmark:
+        run_benchmark(holder, args.benchmark, max(args.clients, 1))
+        return 0
+
+    server = make_server(holder, args.host, args.port)
+    print(
+        f"Servicio Fasecolda en http://{args.host}:{server.server_address[1]} "
+        f"({len(holder.current().index)} referencias de {args.data})"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
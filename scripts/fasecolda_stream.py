@@ -0,0 +1,206 @@
+"""Bounded-memory writers for `fetch_bmw_fasecolda_values.py --stream`.
+
+While detail batches arrive, `StreamingWriter` appends one CSV row and one
+JSONL line per reference and only remembers per-series metadata (first label,
+categoria, tipologías, clases). `write_sorted_outputs` then rebuilds the
+regular artefacts from the JSONL with an external merge sort: sorted runs of
+`run_size` lines are spilled to temporary files and merged with `heapq.merge`,
+so memory stays bounded by the run size and the largest single series.
+
+The sorted CSV and grouped JSON are byte-identical to what `write_csv` and
+`build_series_structure` produce in memory: same keys, and ties keep arrival
+order through the sequence number of each line.
+"""
+
+from __future__ import annotations
+
+import csv
+import heapq
+import json
+import tempfile
+from dataclasses import dataclass, field
+from itertools import groupby
+from pathlib import Path
+from typing import Callable, Dict, IO, Iterator, List, Sequence, Tuple
+
+CSV_FIXED_FIELDS = ("serie", "categoria", "tipologia", "clase", "codigo", "referencia")
+DEFAULT_RUN_SIZE = 50_000
+
+
+def csv_row(reference: dict, years: Sequence[str]) -> List[str]:
+    valores = reference["valores"]
+    return [
+        *(reference[name] for name in CSV_FIXED_FIELDS),
+        *(
+            f"{valores[year]:.1f}" if valores.get(year) is not None else ""
+            for year in years
+        ),
+    ]
+
+
+@dataclass
+class SeriesInfo:
+    """First-seen label/categoria of a serie_key plus its tipologías and clases."""
+
+    first_seq: int
+    serie: str
+    categoria: str
+    tipologias: set = field(default_factory=set)
+    clases: set = field(default_factory=set)
+
+
+class StreamingWriter:
+    """Append references to a CSV (arrival order) and a JSONL file as they arrive."""
+
+    def __init__(self, csv_path: Path, jsonl_path: Path, years: Sequence[str]) -> None:
+        self.years = list(years)
+        self.series: Dict[str, SeriesInfo] = {}
+        self.count = 0
+        self._csv_file = csv_path.open("w", newline="", encoding="utf-8")
+        self._jsonl_file = jsonl_path.open("w", encoding="utf-8")
+        self._csv = csv.writer(self._csv_file)
+        self._csv.writerow([*CSV_FIXED_FIELDS, *self.years])
+
+    def write(self, serie_key: str, reference: dict) -> None:
+        """`reference` carries the CSV fields plus the full `valores` mapping."""
+        info = self.series.get(serie_key)
+        if info is None:
+            info = SeriesInfo(self.count, reference["serie"], reference["categoria"])
+            self.series[serie_key] = info
+        info.tipologias.add(reference["tipologia"])
+        info.clases.add(reference["clase"])
+        self._csv.writerow(csv_row(reference, self.years))
+        self._jsonl_file.write(
+            json.dumps({"serie_key": serie_key, **reference}, ensure_ascii=False) + "\n"
+        )
+        self.count += 1
+
+    def close(self) -> None:
+        self._csv_file.close()
+        self._jsonl_file.close()
+
+    def __enter__(self) -> "StreamingWriter":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+SortKey = Callable[[int, dict], tuple]
+
+
+def _iter_run(handle: IO[str], key: SortKey) -> Iterator[Tuple[tuple, dict]]:
+    for line in handle:
+        seq_text, payload = line.split("\t", 1)
+        reference = json.loads(payload)
+        yield key(int(seq_text), reference), reference
+
+
+def external_sort(
+    jsonl_path: Path, key: SortKey, run_size: int, tmp_dir: Path
+) -> Iterator[dict]:
+    """Yield the JSONL references ordered by `key(seq, reference)`.
+
+    Every key must end with `seq` so equal keys keep arrival order, like the
+    stable in-memory sort.
+    """
+    run_paths: List[Path] = []
+    with jsonl_path.open(encoding="utf-8") as source:
+        seq = 0
+        while True:
+            run: List[Tuple[tuple, int, str]] = []
+            for line in source:
+                run.append((key(seq, json.loads(line)), seq, line))
+                seq += 1
+                if len(run) >= run_size:
+                    break
+            if not run:
+                break
+            run.sort(key=lambda item: item[0])
+            run_path = tmp_dir / f"run_{len(run_paths):05d}.tsv"
+            with run_path.open("w", encoding="utf-8") as handle:
+                handle.writelines(f"{item_seq}\t{line}" for _, item_seq, line in run)
+            run_paths.append(run_path)
+            if len(run) < run_size:
+                break
+
+    handles = [path.open(encoding="utf-8") for path in run_paths]
+    try:
+        merged = heapq.merge(
+            *(_iter_run(handle, key) for handle in handles), key=lambda item: item[0]
+        )
+        for _, reference in merged:
+            yield reference
+    finally:
+        for handle in handles:
+            handle.close()
+
+
+def write_sorted_outputs(
+    jsonl_path: Path,
+    series: Dict[str, SeriesInfo],
+    years: Sequence[str],
+    csv_path: Path,
+    json_path: Path,
+    run_size: int = DEFAULT_RUN_SIZE,
+) -> None:
+    """Rebuild the sorted CSV and the grouped series JSON from the streamed JSONL."""
+
+    def csv_key(seq: int, reference: dict) -> tuple:
+        return (
+            reference["categoria"],
+            reference["serie"].upper(),
+            reference["referencia"].upper(),
+            seq,
+        )
+
+    def json_key(seq: int, reference: dict) -> tuple:
+        info = series[reference["serie_key"]]
+        return (
+            info.categoria,
+            info.serie.upper(),
+            info.first_seq,
+            reference["tipologia"],
+            reference["referencia"],
+            seq,
+        )
+
+    with tempfile.TemporaryDirectory(prefix="fasecolda_sort_") as tmp_name:
+        csv_runs = Path(tmp_name) / "csv"
+        json_runs = Path(tmp_name) / "json"
+        csv_runs.mkdir()
+        json_runs.mkdir()
+
+        with csv_path.open("w", newline="", encoding="utf-8") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow([*CSV_FIXED_FIELDS, *years])
+            for reference in external_sort(jsonl_path, csv_key, run_size, csv_runs):
+                writer.writerow(csv_row(reference, years))
+
+        ordered = external_sort(jsonl_path, json_key, run_size, json_runs)
+        with json_path.open("w", encoding="utf-8") as json_file:
+            json_file.write("[")
+            first = True
+            for serie_key, group in groupby(ordered, key=lambda ref: ref["serie_key"]):
+                info = series[serie_key]
+                entry = {
+                    "serie": info.serie,
+                    "categoria": info.categoria,
+                    "tipologias": sorted(t for t in info.tipologias if t),
+                    "clases": sorted(c for c in info.clases if c),
+                    "referencias": [
+                        {
+                            "codigo": ref["codigo"],
+                            "referencia": ref["referencia"],
+                            "tipologia": ref["tipologia"],
+                            "clase": ref["clase"],
+                            "valores": ref["valores"],
+                        }
+                        for ref in group
+                    ],
+                }
+                # Same text as json.dumps(list, indent=2): each element nested one level.
+                text = json.dumps(entry, indent=2, ensure_ascii=False).replace("\n", "\n  ")
+                json_file.write(("\n  " if first else ",\n  ") + text)
+                first = False
+            json_file.write("]" if first else "\n]")
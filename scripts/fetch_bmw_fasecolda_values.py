@@ -12,35 +12,62 @@ The script performs the following workflow:
 5. Writes two artefacts at the project root level:
    * `bmw_fasecolda_values.csv`: one row per reference, suitable for spreadsheets.
    * `bmw_fasecolda_values.json`: grouped by series for easier programmatic use.
+   `--format json-min msgpack` and `--compress gz br` add compact/precompressed
+   variants next to the JSON (see `fasecolda_artifacts.py`, which also loads them).
 
 Notes
 -----
 * Proporciona las credenciales del API mediante variables de entorno o
   argumentos CLI. Fasecolda expone credenciales en su bundle público y puede
   rotarlas sin aviso, así que maneja autentificación fallida con gracia.
-* Monetary values are returned by the API in millions of COP (as per the public
-  site). The script keeps the numeric values exactly as delivered in the API.
+* Monetary values are returned by the API in thousands of COP, as on the public
+  site (51100.0 = $51.100.000). The script keeps the numeric values exactly as
+  delivered in the API; consumers multiply by 1000 to get pesos.
 """
 
 from __future__ import annotations
 
 import argparse
 import csv
+import hashlib
 import json
 import math
 import os
 import sys
+import threading
 import time
+import unicodedata
+from array import array
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Iterable, List, Sequence
+from typing import Deque, Dict, Iterable, Iterator, List, Sequence
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from fasecolda_artifacts import (
+    COMPRESSIONS,
+    OUTPUT_FORMATS,
+    artifact_path,
+    check_dependencies,
+    encode,
+    sparse_document,
+    write_artifact,
+)
+from fasecolda_stream import DEFAULT_RUN_SIZE, StreamingWriter, write_sorted_outputs
 
 # Project paths
 ROOT_DIR = Path(__file__).resolve().parent.parent
 DEFAULT_JSON_OUTPUT = ROOT_DIR / "bmw_fasecolda_values.json"
 DEFAULT_CSV_OUTPUT = ROOT_DIR / "bmw_fasecolda_values.csv"
+# With several --terms: combined artefacts here, per-term ones as <term>_fasecolda_values.*
+MULTI_TERM_JSON_OUTPUT = ROOT_DIR / "fasecolda_values.json"
+MULTI_TERM_CSV_OUTPUT = ROOT_DIR / "fasecolda_values.csv"
+DEFAULT_CACHE_PATH = ROOT_DIR / "tmp" / "fasecolda_detail_cache.json"
+CACHE_VERSION = 1
+DEFAULT_MAX_AGE_DAYS = 30.0  # the guide is published monthly
 
 # API endpoints and credentials
 BUSQUEDA_URL = "https://fasecoldaback.quantil.co/api/busqueda/{term}"
@@ -49,10 +76,23 @@ DETAIL_URL = "https://guiadevalores.fasecolda.com/apifasecolda/api/listacodigosi
 
 ENV_API_USERNAME = "FASECOLDA_API_USERNAME"
 ENV_API_PASSWORD = "FASECOLDA_API_PASSWORD"
+TOKEN_REFRESH_MARGIN_SECONDS = 120  # renew this long before `expires_in` runs out
 
 YEARS_RANGE_DEFAULT = "2010-2026"
 MAX_CODES_PER_REQUEST = 20  # conservative chunk size used by the public webapp
 
+# Detail download concurrency and adaptive rate limiting
+DEFAULT_CONCURRENCY = 4
+DEFAULT_MAX_RPS = 8.0
+INITIAL_RPS = 5.0  # pace of the former sequential loop (one request every 0.2 s)
+MIN_RPS = 0.5
+RPS_STEP = 0.5  # additive increase after each healthy response
+RPS_BACKOFF_FACTOR = 0.7  # multiplicative decrease after a 429/5xx
+MAX_DETAIL_ATTEMPTS = 5
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
 
 @dataclass(frozen=True)
 class ReferenceRecord:
@@ -63,7 +103,55 @@ class ReferenceRecord:
     clase: str
     codigo: str
     referencia: str
-    valores: Dict[str, float | None]
+    row: int  # row of this reference in the ValuationMatrix
+
+
+class ValuationMatrix:
+    """USADO values for every reference and year in one flat float buffer.
+
+    One row per reference (in arrival order), one column per year in `years`,
+    NaN where Fasecolda publishes no value. `row_by_code` maps each codigo to
+    its first row.
+    """
+
+    def __init__(self, years: Sequence[str]) -> None:
+        self.years = list(years)
+        self.column_by_year = {year: index for index, year in enumerate(self.years)}
+        self.row_by_code: Dict[str, int] = {}
+        self.data = array("d")
+        self.rows = 0
+
+    def add_row(self, codigo: str) -> int:
+        row = self.rows
+        self.data.extend([math.nan] * len(self.years))
+        self.row_by_code.setdefault(codigo, row)
+        self.rows += 1
+        return row
+
+    def set(self, row: int, year: str, value: float) -> bool:
+        column = self.column_by_year.get(year)
+        if column is None:
+            return False
+        self.data[row * len(self.years) + column] = value
+        return True
+
+    def row_values(self, row: int) -> List[float | None]:
+        width = len(self.years)
+        return [
+            value if value == value else None  # NaN -> None
+            for value in self.data[row * width : (row + 1) * width]
+        ]
+
+    def as_dict(self, row: int) -> Dict[str, float | None]:
+        return dict(zip(self.years, self.row_values(row)))
+
+    def value(self, codigo: str, year: str) -> float | None:
+        row = self.row_by_code.get(codigo)
+        column = self.column_by_year.get(year)
+        if row is None or column is None:
+            return None
+        value = self.data[row * len(self.years) + column]
+        return value if value == value else None
 
 
 def parse_args() -> argparse.Namespace:
@@ -73,6 +161,21 @@ def parse_args() -> argparse.Namespace:
         default="BMW",
         help="Termino a buscar en el endpoint publico de Fasecolda (por defecto BMW)",
     )
+    parser.add_argument(
+        "--terms",
+        nargs="+",
+        help=(
+            "Varios terminos (ej. BMW MINI \"MERCEDES BENZ\" DUCATI HONDA SUZUKI). Comparten "
+            "sesion y token, los codigos repetidos se descargan una sola vez y se generan "
+            "artefactos por termino (<termino>_fasecolda_values.*) y combinados "
+            "(fasecolda_values.*). Reemplaza a --term"
+        ),
+    )
+    parser.add_argument(
+        "--terms-file",
+        type=Path,
+        help="Archivo con un termino por linea (se ignoran lineas vacias y las que inician con #)",
+    )
     parser.add_argument(
         "--years",
         default=YEARS_RANGE_DEFAULT,
@@ -84,17 +187,117 @@ def parse_args() -> argparse.Namespace:
         default=MAX_CODES_PER_REQUEST,
         help="Cantidad de codigos solicitados por llamada al detalle (maximo recomendado 22)",
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=(
+            "Cantidad de lotes de detalle descargados en paralelo "
+            f"(por defecto {DEFAULT_CONCURRENCY})"
+        ),
+    )
+    parser.add_argument(
+        "--max-rps",
+        type=float,
+        default=DEFAULT_MAX_RPS,
+        help=(
+            "Tope de solicitudes de detalle por segundo; la tasa arranca en "
+            f"{INITIAL_RPS:g}, baja ante 429/5xx y sube mientras las respuestas sean sanas "
+            f"(por defecto {DEFAULT_MAX_RPS:g})"
+        ),
+    )
     parser.add_argument(
         "--json-output",
         type=Path,
-        default=DEFAULT_JSON_OUTPUT,
-        help="Ruta del archivo JSON de salida",
+        help=(
+            "Ruta del archivo JSON de salida (por defecto bmw_fasecolda_values.json, o "
+            "fasecolda_values.json con varios terminos)"
+        ),
     )
     parser.add_argument(
         "--csv-output",
         type=Path,
-        default=DEFAULT_CSV_OUTPUT,
-        help="Ruta del archivo CSV de salida",
+        help=(
+            "Ruta del archivo CSV de salida (por defecto bmw_fasecolda_values.csv, o "
+            "fasecolda_values.csv con varios terminos)"
+        ),
+    )
+    parser.add_argument(
+        "--format",
+        nargs="+",
+        choices=OUTPUT_FORMATS,
+        default=["json"],
+        help=(
+            "Formatos del artefacto agrupado por serie: json (indentado, por defecto), "
+            "json-min (minificado, valores solo de años con dato) y/o msgpack"
+        ),
+    )
+    parser.add_argument(
+        "--compress",
+        nargs="+",
+        choices=COMPRESSIONS,
+        default=[],
+        help="Genera además copias precomprimidas (.gz y/o .br) de cada artefacto",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help=(
+            "Escribe el CSV (en orden de llegada) y un JSONL por referencia a medida que "
+            "llegan los lotes, sin acumular registros en memoria. No usa la caché"
+        ),
+    )
+    parser.add_argument(
+        "--stream-sort",
+        action="store_true",
+        help=(
+            "Con --stream, reconstruye el CSV ordenado y el JSON agrupado por serie "
+            "mediante ordenamiento externo (memoria acotada)"
+        ),
+    )
+    parser.add_argument(
+        "--jsonl-output",
+        type=Path,
+        help="Ruta del JSONL de --stream (por defecto junto al JSON, con extensión .jsonl)",
+    )
+    parser.add_argument(
+        "--sort-run-size",
+        type=int,
+        default=DEFAULT_RUN_SIZE,
+        help=(
+            "Referencias por tramo ordenado en memoria con --stream-sort "
+            f"(por defecto {DEFAULT_RUN_SIZE})"
+        ),
+    )
+    parser.add_argument(
+        "--cache",
+        default=str(DEFAULT_CACHE_PATH),
+        help=(
+            "Caché local con el detalle crudo por código y su hash. Se actualiza en cada "
+            "ejecución; use '' para desactivarla"
+        ),
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Solo solicita al API los códigos nuevos o con detalle más viejo que --max-age-days",
+    )
+    parser.add_argument(
+        "--verify-incremental",
+        action="store_true",
+        help=(
+            "Con --incremental, descarga además el detalle completo y verifica que la salida "
+            "coincida con la de un refresco completo (sale con error si difiere)"
+        ),
+    )
+    parser.add_argument(
+        "--max-age-days",
+        type=float,
+        default=DEFAULT_MAX_AGE_DAYS,
+        help=(
+            "Antigüedad máxima del detalle en caché antes de volver a pedirlo en modo "
+            f"--incremental (por defecto {DEFAULT_MAX_AGE_DAYS:g})"
+        ),
     )
     parser.add_argument(
         "--api-username",
@@ -140,7 +343,10 @@ def fetch_codes(session: requests.Session, term: str) -> List[str]:
     return unique_codes
 
 
-def get_api_token(session: requests.Session, username: str, password: str) -> str:
+def request_api_token(
+    session: requests.Session, username: str, password: str
+) -> tuple[str, float | None]:
+    """Return the bearer token and its lifetime in seconds (None if not reported)."""
     payload = {
         "grant_type": "password",
         "username": username,
@@ -152,9 +358,107 @@ def get_api_token(session: requests.Session, username: str, password: str) -> st
     token = data.get("access_token")
     if not token:
         raise RuntimeError("No se pudo obtener el token de acceso de Fasecolda")
+    try:
+        expires_in = float(data.get("expires_in"))
+    except (TypeError, ValueError):
+        expires_in = None
+    return token, expires_in
+
+
+def read_terms_file(path: Path) -> List[str]:
+    terms = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        term = line.strip()
+        if term and not term.startswith("#"):
+            terms.append(term)
+    return terms
+
+
+def term_slug(term: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", term)
+    ascii_term = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return "_".join("".join(c if c.isalnum() else " " for c in ascii_term.lower()).split())
+
+
+def fetch_codes_by_term(
+    session: requests.Session, terms: Sequence[str], concurrency: int
+) -> Dict[str, List[str]]:
+    """Run the public search for every term in parallel; terms without codes are warned."""
+    codes_by_term: Dict[str, List[str]] = {}
+    with ThreadPoolExecutor(max_workers=max(min(concurrency, len(terms)), 1)) as executor:
+        futures = [executor.submit(fetch_codes, session, term) for term in terms]
+        for term, future in zip(terms, futures):
+            try:
+                codes_by_term[term] = future.result()
+            except RuntimeError as exc:
+                print(f"[WARN] {exc}", file=sys.stderr)
+                codes_by_term[term] = []
+    return codes_by_term
+
+
+def get_api_token(session: requests.Session, username: str, password: str) -> str:
+    token, _ = request_api_token(session, username, password)
     return token
 
 
+class TokenManager:
+    """Keep a bearer token fresh for the whole detail download.
+
+    The token is renewed `TOKEN_REFRESH_MARGIN_SECONDS` before `expires_in`
+    elapses, and on demand after a 401. Credentials given on the CLI win;
+    otherwise the environment variables are read again on every renewal, so
+    rotated credentials are picked up without restarting a long run.
+    """
+
+    def __init__(
+        self,
+        session: requests.Session,
+        username: str | None = None,
+        password: str | None = None,
+    ) -> None:
+        self.session = session
+        self.username = username
+        self.password = password
+        self._token: str | None = None
+        self._expires_at: float | None = None
+        self._lock = threading.Lock()
+
+    def credentials(self) -> tuple[str, str]:
+        username = self.username or os.environ.get(ENV_API_USERNAME)
+        password = self.password or os.environ.get(ENV_API_PASSWORD)
+        if not username or not password:
+            raise RuntimeError(
+                "Credenciales del API faltantes. Define --api-username/--api-password o "
+                f"las variables de entorno {ENV_API_USERNAME}/{ENV_API_PASSWORD}."
+            )
+        return username, password
+
+    def _renew(self) -> str:
+        token, expires_in = request_api_token(self.session, *self.credentials())
+        self._token = token
+        self._expires_at = (
+            time.monotonic() + expires_in - min(TOKEN_REFRESH_MARGIN_SECONDS, expires_in / 2)
+            if expires_in is not None
+            else None
+        )
+        return token
+
+    def get(self) -> str:
+        with self._lock:
+            if self._token is None or (
+                self._expires_at is not None and time.monotonic() >= self._expires_at
+            ):
+                return self._renew()
+            return self._token
+
+    def refresh(self, rejected_token: str) -> str:
+        """Renew after a 401, unless another worker already replaced `rejected_token`."""
+        with self._lock:
+            if self._token != rejected_token:
+                return self._token or self._renew()
+            return self._renew()
+
+
 def chunked(sequence: Sequence[str], size: int) -> Iterable[Sequence[str]]:
     if size <= 0:
         raise ValueError("chunk size must be positive")
@@ -180,72 +484,467 @@ def build_labels(item: dict) -> tuple[str, str]:
     return serie_label, full_label
 
 
-def collect_reference_records(
+class AdaptiveRateLimiter:
+    """Token bucket shared by the detail workers (AIMD on the refill rate).
+
+    Healthy responses raise the rate by `RPS_STEP` up to `max_rps`; a 429/5xx
+    scales it by `RPS_BACKOFF_FACTOR` and pauses every worker until the backoff
+    delay has elapsed.
+    """
+
+    def __init__(self, max_rps: float, initial_rps: float = INITIAL_RPS) -> None:
+        self.max_rps = max(max_rps, MIN_RPS)
+        self.rate = min(max(initial_rps, MIN_RPS), self.max_rps)
+        self._tokens = 1.0
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now >= self._paused_until:
+                    elapsed = now - max(self._updated, self._paused_until)
+                    self._tokens = min(1.0, self._tokens + elapsed * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1.0:
+                        self._tokens -= 1.0
+                        return
+                    wait = (1.0 - self._tokens) / self.rate
+                else:
+                    wait = self._paused_until - now
+            time.sleep(wait)
+
+    def on_success(self) -> None:
+        with self._lock:
+            self.rate = min(self.max_rps, self.rate + RPS_STEP)
+
+    def on_throttle(self, delay: float) -> None:
+        with self._lock:
+            self.rate = max(MIN_RPS, self.rate * RPS_BACKOFF_FACTOR)
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            self._tokens = 0.0
+
+
+def backoff_delay(response: requests.Response | None, attempt: int) -> float:
+    """Honour a numeric Retry-After header, otherwise back off exponentially."""
+    if response is not None:
+        retry_after = response.headers.get("Retry-After", "")
+        try:
+            return min(max(float(retry_after), 0.0), BACKOFF_MAX_SECONDS)
+        except ValueError:
+            pass
+    return min(BACKOFF_BASE_SECONDS * 2**attempt, BACKOFF_MAX_SECONDS)
+
+
+def reference_payload(record: ReferenceRecord, matrix: ValuationMatrix) -> dict:
+    """Flat, JSON-ready view of one reference (used by the streaming writers)."""
+    return {
+        "serie": record.serie_label,
+        "categoria": record.categoria,
+        "tipologia": record.tipologia,
+        "clase": record.clase,
+        "codigo": record.codigo,
+        "referencia": record.referencia,
+        "valores": matrix.as_dict(record.row),
+    }
+
+
+def fetch_detail_batch(
     session: requests.Session,
-    codes: List[str],
-    token: str,
-    years: List[str],
-    chunk_size: int,
-) -> List[ReferenceRecord]:
-    headers = {"Authorization": f"Bearer {token}"}
-    records: List[ReferenceRecord] = []
-    missing_codes: List[str] = []
+    batch: Sequence[str],
+    tokens: TokenManager,
+    limiter: AdaptiveRateLimiter,
+) -> object:
+    """Download one detail batch, retrying 429/5xx and network errors with backoff.
 
-    for batch in chunked(codes, chunk_size):
-        url = DETAIL_URL.format(codes=",".join(batch))
-        response = session.get(url, headers=headers, timeout=60)
+    Every attempt asks `tokens` for the current token, so retries after a
+    backoff pick up the proactive renewal. A 401 forces one renewal and retries
+    the same batch without using up one of the `MAX_DETAIL_ATTEMPTS`; only a
+    renewed token that is rejected before the API ever accepted it is treated
+    as bad credentials, so a later expiry in a long batch renews again.
+    """
+    url = DETAIL_URL.format(codes=",".join(batch))
+    unproven_token: str | None = None  # issued by our forced renewal, not yet accepted
+    attempt = 0
+    while True:
+        token = tokens.get()
+        limiter.acquire()
+        try:
+            response = session.get(
+                url, headers={"Authorization": f"Bearer {token}"}, timeout=60
+            )
+        except (requests.ConnectionError, requests.Timeout):
+            attempt += 1
+            if attempt >= MAX_DETAIL_ATTEMPTS:
+                raise
+            limiter.on_throttle(backoff_delay(None, attempt - 1))
+            continue
         if response.status_code == 401:
-            raise RuntimeError("El token expiró durante la descarga; reintente la ejecución")
+            if token == unproven_token:
+                raise RuntimeError(
+                    "Fasecolda rechazó también el token renovado; verifique las credenciales"
+                )
+            unproven_token = tokens.refresh(token)
+            continue
+        unproven_token = None
+        attempt += 1
+        if response.status_code in RETRYABLE_STATUS:
+            if attempt < MAX_DETAIL_ATTEMPTS:
+                limiter.on_throttle(backoff_delay(response, attempt - 1))
+                continue
+            raise requests.HTTPError(
+                f"Lote de detalle sin respuesta válida tras {attempt} intentos "
+                f"(último estado HTTP {response.status_code})",
+                response=response,
+            )
         response.raise_for_status()
-        payload = response.json()
-        if not isinstance(payload, list):
+        limiter.on_success()
+        return response.json()
+
+
+def parse_detail_payload(
+    payload: list, years: List[str]
+) -> tuple[List[ReferenceRecord], ValuationMatrix]:
+    records: List[ReferenceRecord] = []
+    matrix = ValuationMatrix(years)
+    for item in payload:
+        codigo = item.get("codigo")
+        if not codigo:
             continue
-        returned_codes = {item.get("codigo") for item in payload if item.get("codigo")}
-        batch_missing = [code for code in batch if code not in returned_codes]
-        missing_codes.extend(batch_missing)
+        categoria = item.get("categoria", "")
+        tipologia = item.get("tipologia", "")
+        clase = item.get("clase", "")
+        serie_label, full_label = build_labels(item)
+        serie_key = normalize_label(f"{categoria} {serie_label}")
 
-        for item in payload:
-            codigo = item.get("codigo")
-            if not codigo:
+        row = matrix.add_row(codigo)
+        for entry in item.get("valorModelo", []) or []:
+            modelo = entry.get("modelo")
+            estado = entry.get("estado", "").upper()
+            if not modelo or estado != "USADO":
                 continue
-            categoria = item.get("categoria", "")
-            tipologia = item.get("tipologia", "")
-            clase = item.get("clase", "")
-            serie_label, full_label = build_labels(item)
-            serie_key = normalize_label(f"{categoria} {serie_label}")
-
-            valores = {year: None for year in years}
-            for entry in item.get("valorModelo", []) or []:
-                modelo = entry.get("modelo")
-                estado = entry.get("estado", "").upper()
-                if not modelo or estado != "USADO":
-                    continue
-                if modelo in valores:
-                    valor = entry.get("valor")
-                    if isinstance(valor, (int, float)) and not math.isnan(valor):
-                        valores[modelo] = float(valor)
-            records.append(
-                ReferenceRecord(
-                    serie_label=serie_label,
-                    serie_key=serie_key,
-                    categoria=categoria,
-                    tipologia=tipologia,
-                    clase=clase,
-                    codigo=codigo,
-                    referencia=full_label,
-                    valores=valores,
-                )
+            valor = entry.get("valor")
+            if isinstance(valor, (int, float)) and not math.isnan(valor):
+                matrix.set(row, modelo, float(valor))
+        records.append(
+            ReferenceRecord(
+                serie_label=serie_label,
+                serie_key=serie_key,
+                categoria=categoria,
+                tipologia=tipologia,
+                clase=clase,
+                codigo=codigo,
+                referencia=full_label,
+                row=row,
             )
+        )
+    return records, matrix
+
 
-        # be nice with the API
-        time.sleep(0.2)
+def iter_detail_batches(
+    session: requests.Session,
+    codes: List[str],
+    tokens: TokenManager,
+    chunk_size: int,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    max_rps: float = DEFAULT_MAX_RPS,
+) -> Iterator[List[dict]]:
+    """Yield the raw detail payload of every batch, in batch order."""
+    missing_codes: List[str] = []
+    limiter = AdaptiveRateLimiter(max_rps)
+    workers = max(concurrency, 1)
+    batches = iter(chunked(codes, chunk_size))
+
+    # Batches are downloaded in parallel but consumed in submission order, so the
+    # records (and therefore the CSV/JSON) match the sequential run. Only a small
+    # window is in flight so finished payloads never pile up in memory.
+    executor = ThreadPoolExecutor(max_workers=workers)
+    pending: Deque[tuple[Sequence[str], Future]] = deque()
+    try:
+        while True:
+            for batch in batches:
+                pending.append(
+                    (batch, executor.submit(fetch_detail_batch, session, batch, tokens, limiter))
+                )
+                if len(pending) >= workers * 2:
+                    break
+            if not pending:
+                break
+            batch, future = pending.popleft()
+            payload = future.result()
+            if isinstance(payload, list):
+                missing_codes.extend(missing_from(batch, payload))
+                yield payload
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
 
     if missing_codes:
         print(
             f"[WARN] {len(missing_codes)} códigos no devolvieron información: {', '.join(missing_codes[:10])}",
             file=sys.stderr,
         )
-    return records
+
+
+def missing_from(batch: Sequence[str], payload: List[dict]) -> List[str]:
+    returned_codes = {item.get("codigo") for item in payload if item.get("codigo")}
+    return [code for code in batch if code not in returned_codes]
+
+
+def fetch_detail_items(
+    session: requests.Session,
+    codes: List[str],
+    tokens: TokenManager,
+    chunk_size: int,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    max_rps: float = DEFAULT_MAX_RPS,
+) -> List[dict]:
+    """Return the raw detail items for `codes`, in batch order."""
+    items: List[dict] = []
+    for payload in iter_detail_batches(
+        session, codes, tokens, chunk_size, concurrency, max_rps
+    ):
+        items.extend(payload)
+    return items
+
+
+def collect_reference_records(
+    session: requests.Session,
+    codes: List[str],
+    tokens: TokenManager,
+    years: List[str],
+    chunk_size: int,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    max_rps: float = DEFAULT_MAX_RPS,
+) -> tuple[List[ReferenceRecord], ValuationMatrix]:
+    items = fetch_detail_items(session, codes, tokens, chunk_size, concurrency, max_rps)
+    return parse_detail_payload(items, years)
+
+
+def payload_hash(item: dict) -> str:
+    canonical = json.dumps(item, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CacheChanges:
+    added: List[str]
+    changed: List[str]
+    removed: List[str]
+
+
+class DetailCache:
+    """Raw detail payloads keyed by `codigo`, with a content hash and fetch time.
+
+    Stored as a single JSON file so a run can skip codes whose detail is still
+    fresh and report which codes were added, changed or removed. The file is
+    shared by every search term, so it also keeps the codes each term listed
+    last time: a run only retires codes that one of its own terms stopped
+    listing, never those cached for other terms. For each set of terms it also
+    keeps the order in which the last full run received the items, so an
+    incremental run can lay out cached payloads the same way.
+    """
+
+    def __init__(
+        self,
+        path: Path | None,
+        entries: Dict[str, dict] | None = None,
+        terms: Dict[str, List[str]] | None = None,
+        orders: Dict[str, List[str]] | None = None,
+    ) -> None:
+        self.path = path
+        self.entries: Dict[str, dict] = entries or {}
+        self.terms: Dict[str, List[str]] = terms or {}
+        self.orders: Dict[str, List[str]] = orders or {}
+
+    @classmethod
+    def load(cls, path: Path | None) -> "DetailCache":
+        if path is None or not path.exists():
+            return cls(path)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as exc:
+            print(f"[WARN] Caché ilegible en {path}; se descarta: {exc}", file=sys.stderr)
+            return cls(path)
+        if data.get("version") != CACHE_VERSION:
+            return cls(path)
+        return cls(path, data.get("entries", {}), data.get("terms", {}), data.get("orders", {}))
+
+    def stale_codes(self, codes: Iterable[str], max_age_seconds: float) -> List[str]:
+        now = time.time()
+        return [
+            code
+            for code in codes
+            if code not in self.entries
+            or now - self.entries[code].get("fetched_at", 0.0) > max_age_seconds
+        ]
+
+    def update(
+        self,
+        codes_by_term: Dict[str, Sequence[str]],
+        requested: Sequence[str],
+        items: Iterable[dict],
+    ) -> CacheChanges:
+        """Merge freshly downloaded `items` and drop codes that no longer exist.
+
+        A code is removed when a term of this run listed it before and no term
+        lists it now, or when it was requested again and the detail endpoint
+        returned nothing.
+        """
+        now = time.time()
+        added: List[str] = []
+        changed: List[str] = []
+        returned = set()
+        for item in items:
+            codigo = item.get("codigo")
+            if not codigo or codigo in returned:
+                continue
+            returned.add(codigo)
+            digest = payload_hash(item)
+            previous = self.entries.get(codigo)
+            if previous is None:
+                added.append(codigo)
+            elif previous.get("hash") != digest:
+                changed.append(codigo)
+            self.entries[codigo] = {"hash": digest, "fetched_at": now, "payload": item}
+
+        listed = {code for term_codes in codes_by_term.values() for code in term_codes}
+        previously_listed = {
+            code for term in codes_by_term for code in self.terms.get(term, ())
+        }
+        listed_elsewhere = {
+            code
+            for term, term_codes in self.terms.items()
+            if term not in codes_by_term
+            for code in term_codes
+        }
+        requested_set = set(requested)
+        removed = sorted(
+            code
+            for code in self.entries
+            if (code in previously_listed and code not in listed and code not in listed_elsewhere)
+            or (code in requested_set and code not in returned)
+        )
+        for code in removed:
+            del self.entries[code]
+        for term, term_codes in codes_by_term.items():
+            self.terms[term] = sorted({code for code in term_codes if code})
+        return CacheChanges(added=sorted(added), changed=sorted(changed), removed=removed)
+
+    def record_order(self, run_key: str, items: Iterable[dict]) -> None:
+        """Remember the order a full run received `items` in, duplicates included."""
+        self.orders[run_key] = [item["codigo"] for item in items if item.get("codigo")]
+
+    def items_for(self, run_key: str, codes: Sequence[str]) -> List[dict]:
+        """Cached payloads for `codes`, laid out like the last full run of `run_key`.
+
+        The serie label that wins and the order of ties depend on item order,
+        so codes follow the recorded full run, repeated where the API repeated
+        them. Codes that run did not see go right after the code preceding them
+        in `codes`; without a recorded run the result is in `codes` order.
+        """
+        wanted = {code for code in codes if code in self.entries}
+        order = [code for code in self.orders.get(run_key, ()) if code in wanted]
+        anchors = set(order)
+        placed = set()
+        leading: List[str] = []
+        following: Dict[str, List[str]] = {}
+        previous: str | None = None
+        for code in codes:
+            if code in anchors:
+                previous = code
+            elif code in wanted and code not in placed:
+                placed.add(code)
+                if previous is None:
+                    leading.append(code)
+                else:
+                    following.setdefault(previous, []).append(code)
+        layout = list(leading)
+        for code in order:
+            layout.append(code)
+            layout.extend(following.pop(code, ()))
+        return [self.entries[code]["payload"] for code in layout]
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.write_text(
+            json.dumps(
+                {
+                    "version": CACHE_VERSION,
+                    "terms": self.terms,
+                    "orders": self.orders,
+                    "entries": self.entries,
+                },
+                ensure_ascii=False,
+            ),
+            encoding="utf-8",
+        )
+        os.replace(tmp_path, self.path)
+
+
+def compare_with_full_run(
+    merged_items: Sequence[dict], full_items: Sequence[dict], years: List[str]
+) -> bool:
+    """`--verify-incremental`: check the merged output against a full refresh.
+
+    Reports codes whose cached detail no longer matches the API and whether the
+    serialised output (JSON document and CSV row order) is identical.
+    """
+    fresh_hashes: Dict[str, str] = {}
+    for item in full_items:
+        if item.get("codigo"):
+            fresh_hashes.setdefault(item["codigo"], payload_hash(item))
+    outdated = sorted(
+        {
+            item["codigo"]
+            for item in merged_items
+            if fresh_hashes.get(item["codigo"]) != payload_hash(item)
+        }
+    )
+    missing = sorted(set(fresh_hashes) - {item["codigo"] for item in merged_items})
+
+    outputs = []
+    for items in (merged_items, full_items):
+        records, matrix = parse_detail_payload(items, years)
+        csv_rows = sorted(
+            records, key=lambda r: (r.categoria, r.serie_label.upper(), r.referencia.upper())
+        )
+        outputs.append(
+            (
+                serialise_series(build_series_structure(records), matrix),
+                [reference_payload(record, matrix) for record in csv_rows],
+            )
+        )
+    identical = outputs[0] == outputs[1]
+    verdict = "idéntica" if identical else "DISTINTA"
+    print(
+        f"Verificación incremental: {len(outdated)} códigos con detalle desactualizado, "
+        f"{len(missing)} ausentes; salida {verdict} a la de un refresco completo"
+    )
+    for code in (outdated + missing)[:20]:
+        print(f"  - {code}")
+    return identical
+
+
+def print_cache_changes(changes: CacheChanges, limit: int = 20) -> None:
+    print(
+        f"Cambios frente a la caché: {len(changes.added)} nuevos, "
+        f"{len(changes.changed)} modificados, {len(changes.removed)} retirados"
+    )
+    for label, codes in (
+        ("Nuevos", changes.added),
+        ("Modificados", changes.changed),
+        ("Retirados", changes.removed),
+    ):
+        if not codes:
+            continue
+        shown = ", ".join(codes[:limit])
+        extra = f" (+{len(codes) - limit} más)" if len(codes) > limit else ""
+        print(f"  {label}: {shown}{extra}")
 
 
 def build_series_structure(records: Iterable[ReferenceRecord]) -> List[dict]:
@@ -269,7 +968,7 @@ def build_series_structure(records: Iterable[ReferenceRecord]) -> List[dict]:
                 "referencia": record.referencia,
                 "tipologia": record.tipologia,
                 "clase": record.clase,
-                "valores": record.valores,
+                "row": record.row,
             }
         )
 
@@ -289,7 +988,10 @@ def build_series_structure(records: Iterable[ReferenceRecord]) -> List[dict]:
     return sorted(series_list, key=lambda item: (item["categoria"], item["serie"].upper()))
 
 
-def write_csv(records: Sequence[ReferenceRecord], years: Sequence[str], target: Path) -> None:
+def write_csv(
+    records: Sequence[ReferenceRecord], matrix: ValuationMatrix, target: Path
+) -> None:
+    years = matrix.years
     fieldnames = [
         "serie",
         "categoria",
@@ -299,86 +1001,261 @@ def write_csv(records: Sequence[ReferenceRecord], years: Sequence[str], target:
         "referencia",
         *years,
     ]
+    width = len(years)
     with target.open("w", newline="", encoding="utf-8") as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
+        writer = csv.writer(csvfile)
+        writer.writerow(fieldnames)
         for record in sorted(
             records, key=lambda r: (r.categoria, r.serie_label.upper(), r.referencia.upper())
         ):
-            row = {
-                "serie": record.serie_label,
-                "categoria": record.categoria,
-                "tipologia": record.tipologia,
-                "clase": record.clase,
-                "codigo": record.codigo,
-                "referencia": record.referencia,
-            }
-            for year in years:
-                value = record.valores.get(year)
-                row[year] = f"{value:.1f}" if isinstance(value, float) else ""
-            writer.writerow(row)
+            # Read the row straight from the buffer; NaN (value != value) is an empty cell.
+            values = matrix.data[record.row * width : (record.row + 1) * width]
+            writer.writerow(
+                [
+                    record.serie_label,
+                    record.categoria,
+                    record.tipologia,
+                    record.clase,
+                    record.codigo,
+                    record.referencia,
+                    *(f"{value:.1f}" if value == value else "" for value in values),
+                ]
+            )
 
 
-def write_json(series: Sequence[dict], target: Path) -> None:
+def serialise_series(
+    series: Sequence[dict], matrix: ValuationMatrix, sparse: bool = False
+) -> List[dict]:
+    """Turn the series structure into plain JSON-ready dicts.
+
+    With `sparse`, `valores` only keeps the years that have a value.
+    """
     serialisable = []
     for entry in series:
+        referencias = []
+        for ref in entry["referencias"]:
+            valores = matrix.as_dict(ref["row"])
+            if sparse:
+                valores = {year: value for year, value in valores.items() if value is not None}
+            referencias.append(
+                {
+                    "codigo": ref["codigo"],
+                    "referencia": ref["referencia"],
+                    "tipologia": ref["tipologia"],
+                    "clase": ref["clase"],
+                    "valores": valores,
+                }
+            )
         serialisable.append(
             {
                 "serie": entry["serie"],
                 "categoria": entry["categoria"],
                 "tipologias": entry["tipologias"],
                 "clases": entry["clases"],
-                "referencias": [
-                    {
-                        "codigo": ref["codigo"],
-                        "referencia": ref["referencia"],
-                        "tipologia": ref["tipologia"],
-                        "clase": ref["clase"],
-                        "valores": ref["valores"],
-                    }
-                    for ref in entry["referencias"]
-                ],
+                "referencias": referencias,
             }
         )
-    target.write_text(json.dumps(serialisable, indent=2, ensure_ascii=False), encoding="utf-8")
+    return serialisable
+
+
+def write_series_artifacts(
+    series: Sequence[dict],
+    matrix: ValuationMatrix,
+    json_output: Path,
+    formats: Sequence[str],
+    compressions: Sequence[str],
+) -> List[Path]:
+    written: List[Path] = []
+    for fmt in formats:
+        if fmt == "json":
+            document: object = serialise_series(series, matrix)
+        else:
+            document = sparse_document(serialise_series(series, matrix, sparse=True), matrix.years)
+        written.extend(
+            write_artifact(encode(document, fmt), artifact_path(json_output, fmt), compressions)
+        )
+    return written
+
+
+def write_outputs(
+    records: Sequence[ReferenceRecord],
+    matrix: ValuationMatrix,
+    csv_output: Path,
+    json_output: Path,
+    formats: Sequence[str],
+    compressions: Sequence[str],
+) -> None:
+    write_csv(records, matrix, csv_output)
+    artifacts = write_series_artifacts(
+        build_series_structure(records), matrix, json_output, formats, compressions
+    )
+    print(f"CSV guardado en: {to_relative(csv_output)}")
+    for artifact in artifacts:
+        label = "JSON" if artifact == json_output else "Artefacto"
+        print(f"{label} guardado en: {to_relative(artifact)}")
+
+
+def per_term_path(combined: Path, term: str) -> Path:
+    return combined.with_name(f"{term_slug(term)}_{combined.name}")
+
+
+def to_relative(path: Path) -> str:
+    try:
+        return str(path.relative_to(ROOT_DIR))
+    except ValueError:
+        return str(path)
+
+
+def run_stream(
+    args: argparse.Namespace,
+    session: requests.Session,
+    tokens: TokenManager,
+    codes: List[str],
+    years: List[str],
+    chunk_size: int,
+    concurrency: int,
+) -> None:
+    """`--stream`: write every batch to disk as it arrives instead of keeping records."""
+    jsonl_path = args.jsonl_output or args.json_output.with_suffix(".jsonl")
+    tokens.get()
+    with StreamingWriter(args.csv_output, jsonl_path, years) as writer:
+        for payload in iter_detail_batches(
+            session, codes, tokens, chunk_size, concurrency, args.max_rps
+        ):
+            records, matrix = parse_detail_payload(payload, years)
+            for record in records:
+                writer.write(record.serie_key, reference_payload(record, matrix))
+    print(f"Registros descargados: {writer.count}")
+    if not writer.count:
+        raise SystemExit("No se obtuvieron registros; verifique el término buscado")
+    print(f"JSONL guardado en: {to_relative(jsonl_path)}")
+
+    if not args.stream_sort:
+        print(f"CSV (orden de llegada) guardado en: {to_relative(args.csv_output)}")
+        return
+    write_sorted_outputs(
+        jsonl_path,
+        writer.series,
+        years,
+        args.csv_output,
+        args.json_output,
+        max(args.sort_run_size, 1),
+    )
+    print(f"CSV guardado en: {to_relative(args.csv_output)}")
+    print(f"JSON guardado en: {to_relative(args.json_output)}")
 
 
 def main() -> None:
     args = parse_args()
     years = parse_years(args.years)
+    try:
+        check_dependencies(args.format, args.compress)
+    except RuntimeError as exc:
+        raise SystemExit(str(exc)) from exc
+    terms = list(args.terms or [])
+    if args.terms_file:
+        terms.extend(read_terms_file(args.terms_file))
+    terms = list(dict.fromkeys(terms)) or [args.term]
+    multi_term = len(terms) > 1
+    if args.json_output is None:
+        args.json_output = MULTI_TERM_JSON_OUTPUT if multi_term else DEFAULT_JSON_OUTPUT
+    if args.csv_output is None:
+        args.csv_output = MULTI_TERM_CSV_OUTPUT if multi_term else DEFAULT_CSV_OUTPUT
+    args.stream = args.stream or args.stream_sort
+    if args.stream and multi_term:
+        raise SystemExit("--stream admite un solo término; ejecútelo por término")
+    if args.stream and args.incremental:
+        raise SystemExit("--stream no es compatible con --incremental (no usa la caché)")
+    if args.verify_incremental and not args.incremental:
+        raise SystemExit("--verify-incremental requiere --incremental")
+    if args.stream and (args.format != ["json"] or args.compress):
+        raise SystemExit("--stream solo genera el JSON indentado; omita --format/--compress")
     chunk_size = args.chunk_size or MAX_CODES_PER_REQUEST
     chunk_size = min(max(chunk_size, 1), MAX_CODES_PER_REQUEST)
 
-    api_username = args.api_username or os.environ.get(ENV_API_USERNAME)
-    api_password = args.api_password or os.environ.get(ENV_API_PASSWORD)
-    if not api_username or not api_password:
-        raise SystemExit(
-            "Credenciales del API faltantes. Define --api-username/--api-password o "
-            f"las variables de entorno {ENV_API_USERNAME}/{ENV_API_PASSWORD}."
-        )
-
+    concurrency = max(args.concurrency, 1)
     with requests.Session() as session:
-        codes = fetch_codes(session, args.term)
-        print(f"Códigos encontrados para '{args.term}': {len(codes)}")
-        token = get_api_token(session, api_username, api_password)
-        records = collect_reference_records(session, codes, token, years, chunk_size)
+        tokens = TokenManager(session, args.api_username, args.api_password)
+        try:
+            tokens.credentials()
+        except RuntimeError as exc:
+            raise SystemExit(str(exc)) from exc
+        # One pooled connection per worker so parallel batches reuse keep-alive sockets.
+        session.mount("https://", HTTPAdapter(pool_maxsize=concurrency))
+        if multi_term:
+            codes_by_term = fetch_codes_by_term(session, terms, concurrency)
+            for term, term_codes in codes_by_term.items():
+                print(f"Códigos encontrados para '{term}': {len(term_codes)}")
+            codes = sorted(set().union(*codes_by_term.values()))
+            total = sum(len(term_codes) for term_codes in codes_by_term.values())
+            print(
+                f"Códigos únicos: {len(codes)} ({total - len(codes)} repetidos entre términos)"
+            )
+            if not codes:
+                raise SystemExit("Ningún término devolvió códigos")
+        else:
+            codes = fetch_codes(session, terms[0])
+            codes_by_term = {terms[0]: codes}
+            print(f"Códigos encontrados para '{terms[0]}': {len(codes)}")
+        if args.stream:
+            run_stream(args, session, tokens, codes, years, chunk_size, concurrency)
+            return
+        cache_path = Path(args.cache) if args.cache else None
+        cache = DetailCache.load(cache_path)
+        had_cache = bool(cache.entries)
+        if args.incremental:
+            to_fetch = cache.stale_codes(codes, args.max_age_days * 86400)
+            print(f"Códigos a refrescar (nuevos o vencidos): {len(to_fetch)} de {len(codes)}")
+        else:
+            to_fetch = codes
+        items: List[dict] = []
+        if to_fetch:
+            tokens.get()
+            items = fetch_detail_items(
+                session, to_fetch, tokens, chunk_size, concurrency, args.max_rps
+            )
+        full_items: List[dict] | None = None
+        if args.verify_incremental:
+            tokens.get()
+            full_items = fetch_detail_items(
+                session, codes, tokens, chunk_size, concurrency, args.max_rps
+            )
+    changes = cache.update(codes_by_term, to_fetch, items)
+    run_key = "\n".join(sorted(codes_by_term))
+    if args.incremental:
+        # Cached and fresh payloads are laid out like the last full run.
+        items = cache.items_for(run_key, codes)
+    else:
+        cache.record_order(run_key, items)
+    if full_items is not None and not compare_with_full_run(items, full_items, years):
+        raise SystemExit("La salida incremental no coincide con un refresco completo")
+    records, matrix = parse_detail_payload(items, years)
+    if cache_path is not None:
+        cache.save()
+        if had_cache:
+            print_cache_changes(changes)
     print(f"Registros descargados: {len(records)}")
 
     if not records:
         raise SystemExit("No se obtuvieron registros; verifique el término buscado")
 
-    series = build_series_structure(records)
-    write_csv(records, years, args.csv_output)
-    write_json(series, args.json_output)
-
-    def to_relative(path: Path) -> str:
-        try:
-            return str(path.relative_to(ROOT_DIR))
-        except ValueError:
-            return str(path)
-
-    print(f"CSV guardado en: {to_relative(args.csv_output)}")
-    print(f"JSON guardado en: {to_relative(args.json_output)}")
+    if multi_term:
+        for term, term_codes in codes_by_term.items():
+            wanted = set(term_codes)
+            term_records = [record for record in records if record.codigo in wanted]
+            print(f"[{term}] Registros: {len(term_records)}")
+            if not term_records:
+                continue
+            write_outputs(
+                term_records,
+                matrix,
+                per_term_path(args.csv_output, term),
+                per_term_path(args.json_output, term),
+                args.format,
+                args.compress,
+            )
+        print("[Combinado]")
+    write_outputs(records, matrix, args.csv_output, args.json_output, args.format, args.compress)
 
 
 if __name__ == "__main__":
@@ -5,22 +5,38 @@ Importa leads desde un TXT estructurado y los envía a la API de clientes.
 Uso rápido:
   python3 scripts/import_leads_txt_to_sheet.py --dry-run
   python3 scripts/import_leads_txt_to_sheet.py --apply --check-existing
+  python3 scripts/import_leads_txt_to_sheet.py --apply --check-existing --concurrency 8 --max-rps 5
 """
 
 from __future__ import annotations
 
 import argparse
+import gzip
+import hashlib
+import http.client
 import json
 import re
-import socket
+import select
+import sqlite3
 import sys
+import threading
+import time
 import unicodedata
 import urllib.error
 import urllib.parse
 import urllib.request
+import zlib
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import partial
+from itertools import islice
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any, Iterable, Iterator
+
+if TYPE_CHECKING:
+    from fasecolda_matcher import FasecoldaMatcher
 
 CAR_ADVISORS = [
     "Jhon Rodriguez",
@@ -42,30 +58,40 @@ MODEL_ADVISOR_OVERRIDES = {
     "serie 4 420i sportline 2020": "Marco",
 }
 
-CAR_PATTERN = re.compile(
-    r"¿Estas buscando un BMW o MINI COOPER\?:\s*(?P<q1>.*?)\s*"
-    r"¿Para cuando tienes proyectada tu compra\?:\s*(?P<q2>.*?)\s*"
-    r"¿Qué modelo y serie buscas\?:\s*(?P<q3>.*?)\s*"
-    r"Email:\s*(?P<email>.*?)\s*"
-    r"Full name:\s*(?P<name>.*?)\s*"
-    r"Phone number:\s*(?P<phone>.*?)\s*"
-    r"(?:City:\s*(?P<city>.*)\s*)?$",
-    flags=re.IGNORECASE,
-)
-
-MOTO_PATTERN = re.compile(
-    r"¿Estas buscando moto de alto cilindraje\?:\s*(?P<q1>.*?)\s*"
-    r"¿Para cuando tienes proyectada la compra\?:\s*(?P<q2>.*?)\s*"
-    r"¿Qué modelo y series buscas\?:\s*(?P<q3>.*?)\s*"
-    r"Email:\s*(?P<email>.*?)\s*"
-    r"Full name:\s*(?P<name>.*?)\s*"
-    r"Phone number:\s*(?P<phone>.*?)\s*"
-    r"(?:City:\s*(?P<city>.*)\s*)?$",
+# Etiquetas de las preguntas del formulario de Meta, en el orden en que llegan.
+LEAD_LABELS = {
+    "car_q1": "¿Estas buscando un BMW o MINI COOPER?:",
+    "car_q2": "¿Para cuando tienes proyectada tu compra?:",
+    "car_q3": "¿Qué modelo y serie buscas?:",
+    "moto_q1": "¿Estas buscando moto de alto cilindraje?:",
+    "moto_q2": "¿Para cuando tienes proyectada la compra?:",
+    "moto_q3": "¿Qué modelo y series buscas?:",
+    "email": "Email:",
+    "name": "Full name:",
+    "phone": "Phone number:",
+    "city": "City:",
+}
+SEGMENT_LABELS = {
+    "Carros": ("car_q1", "car_q2", "car_q3"),
+    "Motos": ("moto_q1", "moto_q2", "moto_q3"),
+}
+CONTACT_LABELS = ("email", "name", "phone")
+SEGMENT_BY_FIRST_LABEL = {labels[0]: segmento for segmento, labels in SEGMENT_LABELS.items()}
+# El lookahead por primer carácter evita probar todas las alternativas en cada posición.
+LABEL_PATTERN = re.compile(
+    "(?=[%s])(?:%s)"
+    % (
+        re.escape("".join(sorted({text[0] for text in LEAD_LABELS.values()}))),
+        "|".join(f"(?P<{key}>{re.escape(text)})" for key, text in LEAD_LABELS.items()),
+    ),
     flags=re.IGNORECASE,
 )
 
 LEAD_SPLIT_PATTERN = re.compile(r"\bLead\s+\d+\s+", flags=re.IGNORECASE)
+LEAD_TAIL_PATTERN = re.compile(r"\bLead(?:\s+\d+)?$", flags=re.IGNORECASE)
 SEP_PATTERN = re.compile(r"[—-]{5,}")
+YEAR_PATTERN = re.compile(r"\b(19\d{2}|20\d{2})\b")
+YEAR_FRAGMENT_PATTERN = re.compile(r"19\d{2}|20\d{2}")
 
 
 @dataclass
@@ -117,6 +143,22 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help='Asigna asesor por mejor match contra carpetas en "Mercado libre/<asesor>/<vehiculo>"',
     )
+    parser.add_argument(
+        "--fasecolda-estimate",
+        action="store_true",
+        help="Llena Presupuesto con el valor Fasecolda de la referencia más parecida al vehículo",
+    )
+    parser.add_argument(
+        "--fasecolda-data",
+        default="bmw_fasecolda_values.json",
+        help="Artefacto de valores Fasecolda usado por --fasecolda-estimate",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Procesos para parsear leads y armar payloads en paralelo (1 = un solo proceso)",
+    )
     parser.add_argument(
         "--dry-run",
         action="store_true",
@@ -132,6 +174,55 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Consulta por teléfono antes de insertar para evitar duplicados",
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Leads enviados en paralelo durante --apply (1 = secuencial)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1,
+        help="Leads por POST cuando el backend soporta inserción por lotes (1 = uno por solicitud)",
+    )
+    parser.add_argument(
+        "--http-pool-size",
+        type=int,
+        default=0,
+        help="Conexiones keep-alive reutilizables por host (0 = igual a --concurrency)",
+    )
+    parser.add_argument(
+        "--max-rps",
+        type=float,
+        default=0,
+        help="Máximo de solicitudes HTTP por segundo entre todos los hilos (0 = sin límite)",
+    )
+    parser.add_argument(
+        "--dedup-index",
+        default="tmp/import_leads_index.sqlite3",
+        help="Índice SQLite de teléfonos ya importados en corridas previas ('' para desactivarlo)",
+    )
+    parser.add_argument(
+        "--index-since",
+        default="",
+        help="Solo omite teléfonos registrados en el índice desde esta fecha (AAAA-MM-DD o ISO 8601)",
+    )
+    parser.add_argument(
+        "--reset-index",
+        action="store_true",
+        help="Vacía el índice local antes de procesar",
+    )
+    parser.add_argument(
+        "--journal",
+        default="tmp/import_leads_journal.jsonl",
+        help="Bitácora append-only con el resultado de cada lead enviado en --apply",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Omite los leads que la bitácora ya registra como procesados para este archivo",
+    )
     parser.add_argument(
         "--output-json",
         default="",
@@ -164,19 +255,64 @@ def load_app_config_defaults() -> tuple[str, str]:
     return base, api_key
 
 
-def normalize_text(raw: str) -> str:
-    clean_lines = [line.strip() for line in raw.replace("\ufeff", "").splitlines() if line.strip()]
-    return " ".join(clean_lines)
+def iter_clean_lines(path: Path) -> Iterator[str]:
+    """
+    Lee el TXT línea a línea, sin BOM ni espacios extremos y omitiendo vacías.
+    """
+    with path.open("r", encoding="utf-8", errors="ignore") as handle:
+        for raw_line in handle:
+            for line in raw_line.replace("\ufeff", "").splitlines():
+                stripped = line.strip()
+                if stripped:
+                    yield stripped
+
+
+def compact_chunk(chunk: str) -> str:
+    return SEP_PATTERN.split(chunk, maxsplit=1)[0].strip()
 
 
-def split_leads(normalized_text: str) -> list[str]:
-    chunks = LEAD_SPLIT_PATTERN.split(normalized_text)
-    result: list[str] = []
-    for chunk in chunks[1:]:
-        compact = SEP_PATTERN.split(chunk, maxsplit=1)[0].strip()
+def iter_lead_chunks(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Entrega el texto de cada lead a medida que se detecta el siguiente "Lead N".
+
+    Equivale a unir todas las líneas con espacios y partir por
+    LEAD_SPLIT_PATTERN, pero solo mantiene en memoria el lead en curso.
+    """
+    pending = ""
+    started = False
+    # Inicio (en `pending`) de la penúltima línea: un "Lead" + "N" abarca como mucho dos líneas.
+    previous_start = last_start = 0
+    for line in lines:
+        scan_from = len(pending)
+        # Un "Lead" o "Lead N" al final de las líneas anteriores puede completarse con esta.
+        if pending and (pending[-1].isdigit() or pending[-4:].lower() == "lead"):
+            tail = LEAD_TAIL_PATTERN.search(pending, previous_start)
+            if tail:
+                scan_from = tail.start()
+        line_start = len(pending) + 1 if pending else 0
+        pending = f"{pending} {line}" if pending else line
+        previous_start, last_start = last_start, line_start
+
+        if scan_from < line_start or "lead" in line.lower():
+            match = LEAD_SPLIT_PATTERN.search(pending, scan_from)
+            while match:
+                if started:
+                    compact = compact_chunk(pending[: match.start()])
+                    if compact:
+                        yield compact
+                started = True
+                pending = pending[match.end() :]
+                previous_start = last_start = 0
+                match = LEAD_SPLIT_PATTERN.search(pending)
+        if not started:
+            # Lo previo al primer "Lead N" se descarta; solo se guarda un posible inicio.
+            tail = LEAD_TAIL_PATTERN.search(pending, previous_start)
+            pending = pending[tail.start() :] if tail else ""
+            previous_start = last_start = 0
+    if started:
+        compact = compact_chunk(pending)
         if compact:
-            result.append(compact)
-    return result
+            yield compact
 
 
 def clean_phone(phone_raw: str) -> str:
@@ -246,51 +382,116 @@ def load_mercado_vehicle_dirs(base_path: Path) -> list[tuple[str, str]]:
     return entries
 
 
-def choose_advisor_from_mercado(lead: ParsedLead, market_entries: list[tuple[str, str]]) -> str:
-    if not market_entries:
+@dataclass
+class MercadoEntry:
+    advisor: str
+    normalized: str
+    words: frozenset[str]
+    has_year: bool
+
+
+@dataclass
+class MercadoIndex:
+    """
+    Carpetas de "Mercado libre" normalizadas una sola vez, con índices invertidos.
+
+    `word_postings` mapea cada palabra a las entradas que la contienen y
+    `year_postings` cada año (19xx/20xx) a las entradas donde aparece como
+    subcadena, igual que la comparación `year in normalized_vehicle`.
+    """
+
+    entries: list[MercadoEntry]
+    word_postings: dict[str, set[int]]
+    year_postings: dict[str, set[int]]
+    substring_cache: dict[str, set[int]]
+
+    def entries_containing(self, fragment: str) -> set[int]:
+        """
+        Entradas con alguna palabra que contenga `fragment` (memoizado por token).
+        """
+        cached = self.substring_cache.get(fragment)
+        if cached is None:
+            cached = set()
+            for word, positions in self.word_postings.items():
+                if fragment in word:
+                    cached |= positions
+            self.substring_cache[fragment] = cached
+        return cached
+
+
+def build_mercado_index(market_entries: list[tuple[str, str]]) -> MercadoIndex:
+    entries: list[MercadoEntry] = []
+    word_postings: dict[str, set[int]] = {}
+    year_postings: dict[str, set[int]] = {}
+    for position, (advisor, vehicle_name) in enumerate(market_entries):
+        normalized_vehicle = normalize_for_match(vehicle_name)
+        vehicle_words = frozenset(normalized_vehicle.split())
+        has_year = YEAR_PATTERN.search(normalized_vehicle) is not None
+        entries.append(MercadoEntry(advisor, normalized_vehicle, vehicle_words, has_year))
+        for word in vehicle_words:
+            word_postings.setdefault(word, set()).add(position)
+            for start in range(len(word) - 3):
+                fragment = word[start : start + 4]
+                if YEAR_FRAGMENT_PATTERN.fullmatch(fragment):
+                    year_postings.setdefault(fragment, set()).add(position)
+    return MercadoIndex(entries, word_postings, year_postings, {})
+
+
+def choose_advisor_from_mercado(lead: ParsedLead, market_index: MercadoIndex) -> str:
+    if not market_index.entries:
         return ""
 
     model = lead.modelo_serie
     model_key = normalize_for_match(model)
     if model_key in MODEL_ADVISOR_OVERRIDES:
         return MODEL_ADVISOR_OVERRIDES[model_key]
-    year_match = re.findall(r"\b(19\d{2}|20\d{2})\b", model)
+    year_match = YEAR_PATTERN.findall(model)
     year = year_match[-1] if year_match else ""
     tokens = extract_match_tokens(model)
-    lead_yearless_model = re.sub(r"\b(19\d{2}|20\d{2})\b", "", model)
+    lead_yearless_model = YEAR_PATTERN.sub("", model)
     lead_yearless_model = " ".join(lead_yearless_model.split())
     lead_brand = normalize_brand(lead.respuesta_1, lead_yearless_model)
     lead_brand_token = normalize_for_match(lead_brand)
 
+    # Sin año ni token en común el puntaje máximo es 4 (marca), por debajo del
+    # umbral de 8, así que solo se califican las entradas que comparten alguno.
+    candidates: set[int] = set(market_index.year_postings.get(year, ())) if year else set()
+    token_weights: list[tuple[str, int, int]] = []
+    for token in tokens:
+        is_code_token = (
+            len(token) >= 3
+            and re.search(r"[a-z]", token) is not None
+            and re.search(r"\d", token) is not None
+        )
+        exact_weight = 5 if is_code_token else 3
+        partial_weight = 2 if is_code_token else 1
+        token_weights.append((token, exact_weight, partial_weight))
+        if len(token) >= 4:
+            candidates |= market_index.entries_containing(token)
+        else:
+            candidates |= market_index.word_postings.get(token, set())
+
     best_score = -999
     best_hits = -1
     best_advisor = ""
 
-    for advisor, vehicle_name in market_entries:
-        normalized_vehicle = normalize_for_match(vehicle_name)
-        vehicle_words = set(normalized_vehicle.split())
-        vehicle_years = re.findall(r"\b(19\d{2}|20\d{2})\b", normalized_vehicle)
+    for position in sorted(candidates):
+        entry = market_index.entries[position]
+        normalized_vehicle = entry.normalized
 
         score = 0
         hits = 0
 
         if year and year in normalized_vehicle:
             score += 8
-        elif year and vehicle_years:
+        elif year and entry.has_year:
             score -= 2
 
         if lead_brand_token and lead_brand_token in normalized_vehicle:
             score += 4
 
-        for token in tokens:
-            is_code_token = (
-                len(token) >= 3
-                and re.search(r"[a-z]", token) is not None
-                and re.search(r"\d", token) is not None
-            )
-            exact_weight = 5 if is_code_token else 3
-            partial_weight = 2 if is_code_token else 1
-            if token in vehicle_words:
+        for token, exact_weight, partial_weight in token_weights:
+            if token in entry.words:
                 score += exact_weight
                 hits += 1
             elif len(token) >= 4 and token in normalized_vehicle:
@@ -300,7 +501,7 @@ def choose_advisor_from_mercado(lead: ParsedLead, market_entries: list[tuple[str
         if score > best_score or (score == best_score and hits > best_hits):
             best_score = score
             best_hits = hits
-            best_advisor = advisor
+            best_advisor = entry.advisor
 
     # Umbral mínimo para evitar asignaciones sin relación.
     if best_score < 8:
@@ -308,36 +509,55 @@ def choose_advisor_from_mercado(lead: ParsedLead, market_entries: list[tuple[str
     return best_advisor
 
 
-def parse_chunk(chunk: str) -> ParsedLead:
-    car = CAR_PATTERN.match(chunk)
-    if car:
-        data = car.groupdict()
-        return ParsedLead(
-            segmento="Carros",
-            respuesta_1=data["q1"].strip(),
-            ventana_compra=data["q2"].strip(),
-            modelo_serie=data["q3"].strip(),
-            email=data["email"].strip(),
-            nombre=data["name"].strip(),
-            telefono=clean_phone(data["phone"]),
-            ciudad=(data.get("city") or "").strip(),
-        )
+def tokenize_chunk(chunk: str) -> tuple[str, list[str]] | None:
+    """
+    Recorre una sola vez las etiquetas del lead y devuelve segmento y respuestas.
+
+    El segmento se decide por la primera etiqueta (debe abrir el bloque); luego
+    cada etiqueta esperada toma su primera aparición tras la anterior. `City:`
+    es opcional. Retorna None si falta alguna etiqueta obligatoria.
+    """
+    labels = LABEL_PATTERN.finditer(chunk)
+    first = next(labels, None)
+    if first is None or first.start() != 0:
+        return None
+    segmento = SEGMENT_BY_FIRST_LABEL.get(first.lastgroup or "")
+    if segmento is None:
+        return None
+
+    expected = (*SEGMENT_LABELS[segmento][1:], *CONTACT_LABELS, "city")
+    values: list[str] = []
+    value_start = first.end()
+    for match in labels:
+        if len(values) == len(expected):
+            break
+        if match.lastgroup != expected[len(values)]:
+            continue
+        values.append(chunk[value_start : match.start()].strip())
+        value_start = match.end()
+    if len(values) < len(expected) - 1:
+        return None
+    values.append(chunk[value_start:].strip())
+    return segmento, values
 
-    moto = MOTO_PATTERN.match(chunk)
-    if moto:
-        data = moto.groupdict()
-        return ParsedLead(
-            segmento="Motos",
-            respuesta_1=data["q1"].strip(),
-            ventana_compra=data["q2"].strip(),
-            modelo_serie=data["q3"].strip(),
-            email=data["email"].strip(),
-            nombre=data["name"].strip(),
-            telefono=clean_phone(data["phone"]),
-            ciudad=(data.get("city") or "").strip(),
-        )
 
-    raise ValueError(f"No se pudo interpretar lead: {chunk[:160]}...")
+def parse_chunk(chunk: str) -> ParsedLead:
+    tokens = tokenize_chunk(chunk)
+    if tokens is None:
+        raise ValueError(f"No se pudo interpretar lead: {chunk[:160]}...")
+
+    segmento, values = tokens
+    q1, q2, q3, email, name, phone, *city = values
+    return ParsedLead(
+        segmento=segmento,
+        respuesta_1=q1,
+        ventana_compra=q2,
+        modelo_serie=q3,
+        email=email,
+        nombre=name,
+        telefono=clean_phone(phone),
+        ciudad=city[0] if city else "",
+    )
 
 
 def extract_year_and_model(modelo_serie: str) -> tuple[str, str]:
@@ -462,6 +682,110 @@ def build_payload(lead: ParsedLead, source_label: str, asesor: str) -> dict[str,
     }
 
 
+# La guía Fasecolda publica los valores en miles de pesos.
+FASECOLDA_VALUE_MULTIPLIER = 1000
+
+
+def estimate_budget(lead: ParsedLead, matcher: FasecoldaMatcher) -> str:
+    """
+    Presupuesto estimado con el valor Fasecolda de la referencia más parecida.
+
+    Retorna "" si el lead no trae año o ninguna referencia supera el umbral del matcher.
+    """
+    year, model_without_year = extract_year_and_model(lead.modelo_serie)
+    if not year:
+        return ""
+    brand = normalize_brand(lead.respuesta_1, model_without_year)
+    match = matcher.match(model_without_year, year, brand=brand, moto=lead.segmento == "Motos")
+    if match is None or match.valor is None:
+        return ""
+    pesos = f"{match.valor * FASECOLDA_VALUE_MULTIPLIER:,.0f}".replace(",", ".")
+    anio = f"{match.anio} aprox." if match.aproximado else match.anio
+    return f"${pesos} (Fasecolda {match.codigo}, {anio})"
+
+
+PreparedLead = tuple[ParsedLead, dict[str, Any], str]
+PREPARE_BATCH_SIZE = 256
+
+# Estado de cada proceso de --workers, armado una vez por `init_prepare_worker`.
+_worker_source_label = ""
+_worker_mercado_index: MercadoIndex | None = None
+_worker_fasecolda_matcher: FasecoldaMatcher | None = None
+
+
+def prepare_lead(
+    chunk: str,
+    source_label: str,
+    mercado_index: MercadoIndex | None,
+    fasecolda_matcher: FasecoldaMatcher | None = None,
+) -> PreparedLead | str:
+    """
+    Parsea un bloque y arma su payload (sin asesor); retorna el error si no se pudo parsear.
+
+    El asesor por cercanía a "Mercado libre" se calcula aquí; la asignación
+    cíclica depende del orden y la resuelve el proceso principal.
+    """
+    try:
+        lead = parse_chunk(chunk)
+    except ValueError as exc:
+        return str(exc)
+    mercado_advisor = choose_advisor_from_mercado(lead, mercado_index) if mercado_index else ""
+    payload = build_payload(lead, source_label, "")
+    if fasecolda_matcher:
+        payload["presupuesto"] = estimate_budget(lead, fasecolda_matcher)
+    return lead, payload, mercado_advisor
+
+
+def init_prepare_worker(
+    source_label: str,
+    mercado_entries: list[tuple[str, str]] | None,
+    fasecolda_data: str | None = None,
+) -> None:
+    global _worker_source_label, _worker_mercado_index, _worker_fasecolda_matcher
+    _worker_source_label = source_label
+    _worker_mercado_index = build_mercado_index(mercado_entries) if mercado_entries is not None else None
+    # Cada proceso arma su matcher; el índice base sale del pickle en tmp/ si está al día.
+    _worker_fasecolda_matcher = None
+    if fasecolda_data:
+        from fasecolda_matcher import FasecoldaMatcher
+
+        _worker_fasecolda_matcher = FasecoldaMatcher.load(fasecolda_data)
+
+
+def prepare_batch(chunks: list[str]) -> list[PreparedLead | str]:
+    return [
+        prepare_lead(chunk, _worker_source_label, _worker_mercado_index, _worker_fasecolda_matcher)
+        for chunk in chunks
+    ]
+
+
+def iter_prepared_in_pool(
+    chunks: Iterable[str],
+    workers: int,
+    source_label: str,
+    mercado_entries: list[tuple[str, str]] | None,
+    fasecolda_data: str | None = None,
+) -> Iterator[PreparedLead | str]:
+    """
+    Reparte los bloques en lotes entre procesos y entrega los resultados en el orden original.
+
+    Solo mantiene `workers * 2` lotes en vuelo para no leer todo el archivo por adelantado.
+    """
+    chunk_iter = iter(chunks)
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=init_prepare_worker,
+        initargs=(source_label, mercado_entries, fasecolda_data),
+    ) as pool:
+        pending: deque[Future] = deque()
+        for batch in iter(lambda: list(islice(chunk_iter, PREPARE_BATCH_SIZE)), []):
+            pending.append(pool.submit(prepare_batch, batch))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
 def choose_advisor(lead: ParsedLead, counters: dict[str, int]) -> str:
     if lead.segmento == "Carros":
         idx = counters["carros"] % len(CAR_ADVISORS)
@@ -476,6 +800,164 @@ def to_json_bytes(data: dict[str, Any]) -> bytes:
     return json.dumps(data, ensure_ascii=False).encode("utf-8")
 
 
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+MAX_REDIRECTS = 10
+# Métodos que se pueden repetir sin riesgo si la conexión se cae esperando la respuesta.
+IDEMPOTENT_METHODS = ("GET", "HEAD")
+
+
+class PooledHttpClient:
+    """
+    Cliente HTTP con conexiones keep-alive reutilizables por host.
+
+    Conserva hasta `pool_size` conexiones ociosas por host (las demás se
+    cierran al terminar), pide respuestas gzip y sigue redirecciones como
+    urllib: un POST redirigido con 301/302/303 continúa como GET sin cuerpo,
+    que es como responde `/exec` de Apps Script.
+
+    Si una conexión reutilizada se cae, solo se reintenta sola cuando el
+    servidor no pudo haber procesado la solicitud: un GET, o cualquier método
+    si el fallo ocurrió antes de terminar de enviar el cuerpo. Un POST cortado
+    al esperar la respuesta puede haber insertado ya el lead, así que se
+    reporta como fallo y lo resuelven la bitácora y --check-existing.
+    """
+
+    def __init__(self, pool_size: int = 4) -> None:
+        self.pool_size = pool_size
+        self._idle: dict[tuple[str, str, int], list[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+
+    def _connect(self, scheme: str, host: str, port: int, timeout: int) -> http.client.HTTPConnection:
+        connection_class = (
+            http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        )
+        proxy = urllib.request.getproxies().get(scheme)
+        if proxy and not urllib.request.proxy_bypass(host):
+            proxy_url = urllib.parse.urlsplit(proxy)
+            connection = connection_class(
+                proxy_url.hostname or "", proxy_url.port or 80, timeout=timeout
+            )
+            connection.set_tunnel(host, port)
+            return connection
+        return connection_class(host, port, timeout=timeout)
+
+    def _acquire(
+        self, key: tuple[str, str, int], timeout: int
+    ) -> tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            idle = self._idle.get(key)
+            connection = idle.pop() if idle else None
+        if connection is None:
+            return self._connect(*key, timeout), False
+        if connection.sock is not None and select.select([connection.sock], [], [], 0)[0]:
+            # Legible estando ociosa: el servidor la cerró (EOF); se descarta antes de usarla.
+            connection.close()
+            return self._connect(*key, timeout), False
+        connection.timeout = timeout
+        if connection.sock is not None:
+            connection.sock.settimeout(timeout)
+        return connection, True
+
+    def _release(self, key: tuple[str, str, int], connection: http.client.HTTPConnection) -> None:
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.pool_size:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def _send(
+        self,
+        method: str,
+        url: str,
+        timeout: int,
+        headers: dict[str, str],
+        body: bytes | None,
+    ) -> tuple[int, dict[str, str], bytes]:
+        parts = urllib.parse.urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ("http", "https") or not parts.hostname:
+            raise urllib.error.URLError(f"URL no soportada: {url}")
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, parts.hostname, port)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+
+        while True:
+            connection, reused = self._acquire(key, timeout)
+            try:
+                connection.request(method, path, body=body, headers=headers)
+            except (ConnectionResetError, BrokenPipeError):
+                connection.close()
+                if reused:
+                    # El cuerpo no llegó completo: el servidor no procesó nada.
+                    continue
+                raise
+            except Exception:
+                connection.close()
+                raise
+            try:
+                response = connection.getresponse()
+                raw = response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError):
+                connection.close()
+                if reused and method in IDEMPOTENT_METHODS:
+                    # El servidor cerró la conexión ociosa; se reintenta con una nueva.
+                    continue
+                raise
+            except Exception:
+                connection.close()
+                raise
+            if response.will_close:
+                connection.close()
+            else:
+                self._release(key, connection)
+            return response.status, {k.lower(): v for k, v in response.getheaders()}, raw
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        timeout: int,
+        headers: dict[str, str],
+        body: bytes | None = None,
+    ) -> tuple[int, bytes]:
+        for _ in range(MAX_REDIRECTS + 1):
+            status, response_headers, raw = self._send(method, url, timeout, headers, body)
+            location = response_headers.get("location")
+            if status not in REDIRECT_STATUSES or not location:
+                break
+            if method == "POST" and status in (307, 308):
+                break
+            if method == "POST":
+                method, body = "GET", None
+                headers = {k: v for k, v in headers.items() if k.lower() != "content-type"}
+            url = urllib.parse.urljoin(url, location)
+
+        encoding = response_headers.get("content-encoding", "").lower()
+        if encoding == "gzip":
+            raw = gzip.decompress(raw)
+        elif encoding == "deflate":
+            raw = zlib.decompress(raw)
+        return status, raw
+
+    def close(self) -> None:
+        with self._lock:
+            idle_connections = [conn for idle in self._idle.values() for conn in idle]
+            self._idle.clear()
+        for connection in idle_connections:
+            connection.close()
+
+
+HTTP_CLIENT = PooledHttpClient()
+DEFAULT_REQUEST_HEADERS = {
+    "Accept": "application/json",
+    "Accept-Encoding": "gzip",
+    "User-Agent": "import_leads_txt_to_sheet",
+}
+
+
 def request_json(
     method: str,
     url: str,
@@ -484,21 +966,16 @@ def request_json(
     headers: dict[str, str] | None = None,
     payload: dict[str, Any] | None = None,
 ) -> tuple[int, dict[str, Any] | str]:
-    req_headers = headers.copy() if headers else {}
+    req_headers = {**DEFAULT_REQUEST_HEADERS, **headers} if headers else DEFAULT_REQUEST_HEADERS
     body = None
     if payload is not None:
         body = to_json_bytes(payload)
-        req_headers["Content-Type"] = "application/json"
-    req = urllib.request.Request(url=url, method=method, headers=req_headers, data=body)
+        req_headers = {**req_headers, "Content-Type": "application/json"}
     try:
-        with urllib.request.urlopen(req, timeout=timeout) as response:
-            raw = response.read().decode("utf-8", errors="ignore")
-            status = int(response.status)
-    except urllib.error.HTTPError as exc:
-        raw = exc.read().decode("utf-8", errors="ignore")
-        status = int(exc.code)
-    except (urllib.error.URLError, TimeoutError, socket.timeout) as exc:
+        status, raw_bytes = HTTP_CLIENT.request(method, url, timeout, req_headers, body)
+    except (OSError, http.client.HTTPException, zlib.error) as exc:
         return 0, {"error": f"Network error: {exc}"}
+    raw = raw_bytes.decode("utf-8", errors="ignore")
     try:
         return status, json.loads(raw)
     except json.JSONDecodeError:
@@ -510,6 +987,55 @@ def is_google_script_url(base_url: str) -> bool:
     return "script.google.com/macros/" in normalized and normalized.endswith("/exec")
 
 
+def api_key_headers(api_key: str) -> dict[str, str]:
+    headers: dict[str, str] = {}
+    if api_key:
+        headers["api-key"] = api_key
+        headers["api_key"] = api_key
+    return headers
+
+
+def fetch_existing_phones(base_url: str, api_key: str, timeout: int) -> set[str] | None:
+    """
+    Descarga en una sola consulta los teléfonos ya registrados (acción `telefonos`).
+
+    Retorna None si el backend no soporta la acción; en ese caso se consulta
+    teléfono por teléfono con `has_existing_record`.
+    """
+    query = urllib.parse.urlencode({"action": "telefonos"})
+    if is_google_script_url(base_url):
+        query_url = f"{base_url.rstrip('/')}?{query}"
+    else:
+        query_url = f"{base_url.rstrip('/')}/api/v1/clientes?{query}"
+
+    status, payload = request_json("GET", query_url, timeout, headers=api_key_headers(api_key))
+    if status != 200 or not isinstance(payload, dict) or payload.get("success") is False:
+        return None
+    phones = payload.get("telefonos")
+    if not isinstance(phones, list):
+        return None
+    return {digits for digits in (clean_phone(str(phone)) for phone in phones) if digits}
+
+
+def fetch_backend_actions(base_url: str, api_key: str, timeout: int) -> set[str]:
+    """
+    Acciones opcionales que anuncia el backend (`action=capacidades`); vacío si no responde.
+    """
+    query = urllib.parse.urlencode({"action": "capacidades"})
+    if is_google_script_url(base_url):
+        query_url = f"{base_url.rstrip('/')}?{query}"
+    else:
+        query_url = f"{base_url.rstrip('/')}/api/v1/clientes?{query}"
+
+    status, payload = request_json("GET", query_url, timeout, headers=api_key_headers(api_key))
+    if status != 200 or not isinstance(payload, dict):
+        return set()
+    actions = payload.get("acciones")
+    if not isinstance(actions, list):
+        return set()
+    return {str(action).lower() for action in actions}
+
+
 def has_existing_record(
     base_url: str,
     phone: str,
@@ -524,11 +1050,7 @@ def has_existing_record(
     else:
         query_url = f"{base_url.rstrip('/')}/api/v1/clientes?{urllib.parse.urlencode({'telefono': phone})}"
 
-    headers = {}
-    if api_key:
-        headers["api_key"] = api_key
-        headers["api-key"] = api_key
-    status, payload = request_json("GET", query_url, timeout, headers=headers)
+    status, payload = request_json("GET", query_url, timeout, headers=api_key_headers(api_key))
     if status != 200 or not isinstance(payload, dict):
         return False
     if payload.get("success") is False:
@@ -539,6 +1061,302 @@ def has_existing_record(
     return expected_key in payload
 
 
+class ImportIndex:
+    """
+    Índice local (SQLite) de teléfonos ya enviados, para omitirlos sin consultar la API.
+
+    La llave es la salida de `normalize_target_phone`; cada fila guarda fecha
+    (UTC), archivo de origen y estado (`inserted` o `existing`). `record` se
+    llama desde los hilos de envío, por eso la conexión se comparte con un lock.
+    """
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS imported_phones (
+                phone TEXT PRIMARY KEY,
+                recorded_at TEXT NOT NULL,
+                source_file TEXT NOT NULL,
+                status TEXT NOT NULL
+            )
+            """
+        )
+        self.connection.commit()
+
+    def reset(self) -> int:
+        removed = self.connection.execute("DELETE FROM imported_phones").rowcount
+        self.connection.commit()
+        return removed
+
+    def known_phones(self, since: str = "") -> set[str]:
+        if since:
+            rows = self.connection.execute(
+                "SELECT phone FROM imported_phones WHERE recorded_at >= ?", (since,)
+            )
+        else:
+            rows = self.connection.execute("SELECT phone FROM imported_phones")
+        return {phone for (phone,) in rows}
+
+    def record(self, phone: str, source_file: str, status: str) -> None:
+        key = normalize_target_phone(phone)
+        if not key:
+            return
+        recorded_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        with self._lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO imported_phones VALUES (?, ?, ?, ?)",
+                (key, recorded_at, source_file, status),
+            )
+            self.connection.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self.connection.close()
+
+
+# Estado que se guarda en el índice local según el resultado del envío.
+INDEX_STATUS_BY_OUTCOME = {"OK": "inserted", "SKIP": "existing"}
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ImportJournal:
+    """
+    Bitácora append-only (JSON Lines) con el resultado de cada lead en --apply.
+
+    Cada línea se escribe apenas termina el envío, identificada por el hash
+    del archivo de entrada y el índice del lead, para que --resume continúe
+    una corrida interrumpida sin reenviar lo ya procesado.
+    """
+
+    def __init__(self, path: Path, file_hash: str) -> None:
+        self.path = path
+        self.file_hash = file_hash
+        self._lock = threading.Lock()
+        self._handle: Any = None
+
+    def completed_indexes(self) -> set[int]:
+        """
+        Índices cuyo último estado registrado no es un fallo (los fallidos se reintentan).
+        """
+        if not self.path.exists():
+            return set()
+        last_status: dict[int, str] = {}
+        with self.path.open("r", encoding="utf-8") as handle:
+            for line in handle:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Última línea truncada si el proceso murió a mitad de escritura.
+                    continue
+                if entry.get("file_hash") == self.file_hash:
+                    last_status[int(entry["index"])] = entry.get("status", "")
+        return {index for index, status in last_status.items() if status != "FAIL"}
+
+    def append(self, index: int, phone: str, outcome: InsertOutcome) -> None:
+        line = json.dumps(
+            {
+                "file_hash": self.file_hash,
+                "index": index,
+                "phone": phone,
+                "status": outcome.status_label,
+                "http_status": outcome.status,
+                "at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            },
+            ensure_ascii=False,
+        )
+        with self._lock:
+            if self._handle is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                needs_newline = self.path.exists() and self.path.stat().st_size > 0
+                if needs_newline:
+                    with self.path.open("rb") as existing:
+                        existing.seek(-1, 2)
+                        needs_newline = existing.read(1) != b"\n"
+                self._handle = self.path.open("a", encoding="utf-8")
+                if needs_newline:
+                    self._handle.write("\n")
+            self._handle.write(line + "\n")
+            self._handle.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+
+
+def parse_index_since(value: str) -> str:
+    """
+    Convierte --index-since al mismo formato ISO UTC con que se guardan las filas.
+    """
+    if not value:
+        return ""
+    parsed = datetime.fromisoformat(value.strip())
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat(timespec="seconds")
+
+
+class RateLimiter:
+    """
+    Reparte turnos espaciados para no superar `max_per_second` solicitudes en total.
+    """
+
+    def __init__(self, max_per_second: float) -> None:
+        self.interval = 1.0 / max_per_second if max_per_second > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+@dataclass
+class InsertOutcome:
+    status_label: str  # "OK", "SKIP", "KNOWN" (índice local), "RESUMED" (bitácora) o "FAIL"
+    status: int = 0
+    response: dict[str, Any] | str = ""
+
+
+@dataclass
+class LeadSender:
+    base_url: str
+    endpoint: str
+    api_key: str
+    headers: dict[str, str]
+    timeout: int
+    check_existing: bool
+    limiter: RateLimiter
+    # Teléfonos ya registrados; None cuando el backend no ofrece la acción masiva.
+    existing_phones: set[str] | None = None
+
+    def is_existing(self, phone: str) -> bool:
+        if not self.check_existing:
+            return False
+        if self.existing_phones is not None:
+            return bool(phone) and phone in self.existing_phones
+        self.limiter.wait()
+        return has_existing_record(self.base_url, phone, self.api_key, self.timeout)
+
+    def send(self, payload: dict[str, Any], previous: Future | None = None) -> InsertOutcome:
+        """
+        Consulta (opcional) e inserta un payload.
+
+        `previous` es el envío anterior con el mismo teléfono: se espera a que
+        termine para que --check-existing vea la inserción, como en modo secuencial.
+        """
+        if previous is not None:
+            previous.result()
+        phone = payload.get("clienteTelefono", "")
+        if self.is_existing(phone):
+            return InsertOutcome("SKIP")
+
+        self.limiter.wait()
+        status, response_payload = request_json(
+            "POST",
+            self.endpoint,
+            self.timeout,
+            headers=self.headers,
+            payload=payload,
+        )
+        if status in (200, 201):
+            if self.existing_phones is not None and phone:
+                self.existing_phones.add(phone)
+            return InsertOutcome("OK", status, response_payload)
+        return InsertOutcome("FAIL", status, response_payload)
+
+    def send_batch(
+        self, payloads: list[dict[str, Any]], previous: Iterable[Future] = ()
+    ) -> list[InsertOutcome]:
+        """
+        Inserta varios payloads en un solo POST (`action: bulkinsert`).
+
+        El backend responde `resultados` en el mismo orden; si la respuesta no
+        trae un resultado por registro, todo el lote se marca como fallido.
+        """
+        for future in previous:
+            future.result()
+        outcomes: list[InsertOutcome | None] = [None] * len(payloads)
+        pending: list[int] = []
+        for position, payload in enumerate(payloads):
+            if self.is_existing(payload.get("clienteTelefono", "")):
+                outcomes[position] = InsertOutcome("SKIP")
+            else:
+                pending.append(position)
+
+        if pending:
+            self.limiter.wait()
+            status, response_payload = request_json(
+                "POST",
+                self.endpoint,
+                self.timeout,
+                headers=self.headers,
+                payload={
+                    "action": "bulkinsert",
+                    "registros": [payloads[position] for position in pending],
+                },
+            )
+            results = None
+            if status in (200, 201) and isinstance(response_payload, dict):
+                results = response_payload.get("resultados")
+            if not isinstance(results, list) or len(results) != len(pending):
+                for position in pending:
+                    outcomes[position] = InsertOutcome("FAIL", status, response_payload)
+            else:
+                for position, result in zip(pending, results):
+                    if isinstance(result, dict) and result.get("success"):
+                        phone = payloads[position].get("clienteTelefono", "")
+                        if self.existing_phones is not None and phone:
+                            self.existing_phones.add(phone)
+                        outcomes[position] = InsertOutcome("OK", status, result)
+                    else:
+                        outcomes[position] = InsertOutcome("FAIL", status, result)
+        return [outcome for outcome in outcomes if outcome is not None]
+
+
+def fan_out_batch(batch_future: Future, item_futures: list[Future]) -> None:
+    """
+    Reparte el resultado de un lote en un future por lead.
+    """
+    if batch_future.cancelled():
+        for item_future in item_futures:
+            item_future.cancel()
+        return
+    error = batch_future.exception()
+    for position, item_future in enumerate(item_futures):
+        if error is not None:
+            item_future.set_exception(error)
+        else:
+            item_future.set_result(batch_future.result()[position])
+
+
+# Envíos sin reportar por hilo: acota la memoria sin dejar hilos ociosos.
+PENDING_SENDS_PER_WORKER = 4
+
+
+def print_parse_errors(errors: list[str]) -> None:
+    print("Errores de parseo:", file=sys.stderr)
+    for err in errors:
+        print(f"- {err}", file=sys.stderr)
+
+
 def main() -> int:
     args = parse_args()
     if args.apply and args.dry_run:
@@ -551,6 +1369,23 @@ def main() -> int:
     base_url = args.base_url.strip() or base_default
     api_key = args.api_key.strip() or key_default
 
+    if args.concurrency < 1:
+        print("--concurrency debe ser un entero positivo.", file=sys.stderr)
+        return 2
+    if args.workers < 1:
+        print("--workers debe ser un entero positivo.", file=sys.stderr)
+        return 2
+    if args.batch_size < 1:
+        print("--batch-size debe ser un entero positivo.", file=sys.stderr)
+        return 2
+    HTTP_CLIENT.pool_size = args.http_pool_size if args.http_pool_size > 0 else args.concurrency
+
+    try:
+        index_since = parse_index_since(args.index_since)
+    except ValueError:
+        print(f"Fecha inválida para --index-since: {args.index_since}", file=sys.stderr)
+        return 2
+
     if args.apply and not base_url:
         print("Falta base URL. Usa --base-url o define APP_CONFIG.BASE_URL.", file=sys.stderr)
         return 2
@@ -560,53 +1395,120 @@ def main() -> int:
         print(f"No existe el archivo: {input_path}", file=sys.stderr)
         return 2
 
-    normalized = normalize_text(input_path.read_text(encoding="utf-8", errors="ignore"))
-    chunks = split_leads(normalized)
-    parsed_leads: list[ParsedLead] = []
+    chunks: Iterable[str] = iter_lead_chunks(iter_clean_lines(input_path))
+    if args.limit and args.limit > 0:
+        # Deja de leer el archivo al completar los N leads pedidos.
+        chunks = islice(chunks, args.limit)
     errors: list[str] = []
 
-    for idx, chunk in enumerate(chunks, start=1):
-        try:
-            parsed_leads.append(parse_chunk(chunk))
-        except ValueError as exc:
-            errors.append(f"Lead {idx}: {exc}")
-
-    if errors:
-        print("Errores de parseo:", file=sys.stderr)
-        for err in errors:
-            print(f"- {err}", file=sys.stderr)
-        return 1
-
     counters = {"carros": 0, "motos": 0}
-    mercado_entries = []
+    mercado_entries: list[tuple[str, str]] | None = None
     if args.assign_advisors_from_mercado:
         mercado_entries = load_mercado_vehicle_dirs(Path("Mercado libre"))
         if not mercado_entries:
             print('No se encontraron carpetas de vehículos en "Mercado libre".')
-    payloads = []
-    for lead in parsed_leads:
-        if args.assign_advisors_from_mercado:
-            assigned = choose_advisor_from_mercado(lead, mercado_entries)
-        elif args.assign_advisors:
-            assigned = choose_advisor(lead, counters)
-        else:
-            assigned = args.asesor
-        payloads.append(build_payload(lead, args.source_label, assigned))
-    if args.limit and args.limit > 0:
-        payloads = payloads[: args.limit]
+
+    fasecolda_data: str | None = None
+    if args.fasecolda_estimate:
+        fasecolda_data = str(Path(args.fasecolda_data).resolve())
+        if not Path(fasecolda_data).exists():
+            print(f"No existe el archivo Fasecolda: {args.fasecolda_data}", file=sys.stderr)
+            return 2
+
+    prepared: Iterable[PreparedLead | str]
+    if args.workers > 1:
+        prepared = iter_prepared_in_pool(
+            chunks, args.workers, args.source_label, mercado_entries, fasecolda_data
+        )
+    else:
+        mercado_index = build_mercado_index(mercado_entries) if mercado_entries is not None else None
+        fasecolda_matcher: FasecoldaMatcher | None = None
+        if fasecolda_data:
+            # Solo se importa con --fasecolda-estimate.
+            from fasecolda_matcher import FasecoldaMatcher
+
+            fasecolda_matcher = FasecoldaMatcher.load(fasecolda_data)
+        prepared = (
+            prepare_lead(chunk, args.source_label, mercado_index, fasecolda_matcher)
+            for chunk in chunks
+        )
 
     seen_phones: set[str] = set()
     duplicate_phones: set[str] = set()
-    for payload in payloads:
-        phone = payload["clienteTelefono"]
-        if phone in seen_phones:
-            duplicate_phones.add(phone)
-        seen_phones.add(phone)
-
-    print(f"Leads parseados: {len(parsed_leads)}")
-    print(f"Teléfonos únicos: {len(seen_phones)}")
-    if duplicate_phones:
-        print(f"Teléfonos duplicados en archivo: {sorted(duplicate_phones)}")
+    parsed_count = 0
+    estimated_count = 0
+
+    def assigned_payloads() -> Iterator[dict[str, Any]]:
+        """
+        Payloads con asesor en el orden del archivo.
+
+        Tras el primer error no entrega más payloads, pero sigue leyendo para
+        reportar todos los errores.
+        """
+        nonlocal parsed_count, estimated_count
+        for idx, result in enumerate(prepared, start=1):
+            if isinstance(result, str):
+                errors.append(f"Lead {idx}: {result}")
+                continue
+            if errors:
+                continue
+            lead, payload, mercado_advisor = result
+            if args.assign_advisors_from_mercado:
+                assigned = mercado_advisor
+            elif args.assign_advisors:
+                assigned = choose_advisor(lead, counters)
+            else:
+                assigned = args.asesor
+            payload["asesor"] = assigned
+            phone = payload["clienteTelefono"]
+            if phone in seen_phones:
+                duplicate_phones.add(phone)
+            seen_phones.add(phone)
+            parsed_count += 1
+            if payload["presupuesto"]:
+                estimated_count += 1
+            yield payload
+
+    def print_parse_summary() -> None:
+        print(f"Leads parseados: {parsed_count}")
+        print(f"Teléfonos únicos: {len(seen_phones)}")
+        if args.fasecolda_estimate:
+            print(f"Presupuestos estimados con Fasecolda: {estimated_count} de {parsed_count}")
+        if duplicate_phones:
+            print(f"Teléfonos duplicados en archivo: {sorted(duplicate_phones)}")
+        if import_index:
+            already_imported = sum(
+                1 for phone in seen_phones if normalize_target_phone(phone) in known_phones
+            )
+            print(f"Teléfonos ya importados según índice local: {already_imported}")
+
+    # Solo la salida JSON y la simulación necesitan todos los payloads a la vez; al
+    # importar, cada payload pasa directo al envío. En ese caso un error de parseo
+    # detiene los envíos en ese lead, pero los anteriores ya quedaron enviados.
+    payloads: Iterable[dict[str, Any]] = assigned_payloads()
+    total = 0
+    materialized = bool(args.output_json or args.dry_run)
+    if materialized:
+        payloads = list(payloads)
+        total = len(payloads)
+        if errors:
+            print_parse_errors(errors)
+            return 1
+
+    import_index: ImportIndex | None = None
+    known_phones: set[str] = set()
+    if args.dedup_index and args.dry_run:
+        # La simulación no debe crear ni modificar el índice local.
+        if args.reset_index:
+            print("--reset-index se ignora en modo simulación.")
+    elif args.dedup_index:
+        import_index = ImportIndex(Path(args.dedup_index))
+        if args.reset_index:
+            print(f"Índice local reiniciado ({import_index.reset()} teléfonos eliminados).")
+        known_phones = import_index.known_phones(index_since)
+
+    if materialized:
+        print_parse_summary()
 
     if args.output_json:
         out_path = Path(args.output_json)
@@ -620,63 +1522,184 @@ def main() -> int:
         print(json.dumps(payloads[:preview_count], ensure_ascii=False, indent=2))
         return 0
 
-    headers = {}
-    if api_key:
-        headers["api-key"] = api_key
-        headers["api_key"] = api_key
+    headers = api_key_headers(api_key)
 
     if is_google_script_url(base_url):
         endpoint = base_url.rstrip("/")
     else:
         endpoint = f"{base_url.rstrip('/')}/api/v1/clientes"
+    existing_phones: set[str] | None = None
+    if args.check_existing:
+        existing_phones = fetch_existing_phones(base_url, api_key, args.timeout)
+        if existing_phones is None:
+            print("El backend no entrega el listado de teléfonos; se consultará uno por uno.")
+        else:
+            print(f"Teléfonos existentes en la hoja: {len(existing_phones)}")
+
+    batch_size = args.batch_size
+    if batch_size > 1 and "bulkinsert" not in fetch_backend_actions(base_url, api_key, args.timeout):
+        print("El backend no soporta inserción por lotes; se enviará un lead por solicitud.")
+        batch_size = 1
+
+    journal = ImportJournal(Path(args.journal), file_sha256(input_path))
+    completed_indexes: set[int] = set()
+    if args.resume:
+        completed_indexes = journal.completed_indexes()
+        print(f"Reanudando: {len(completed_indexes)} leads ya procesados según {journal.path}")
+
+    def record_outcome(idx: int, phone: str, future: Future) -> None:
+        if future.cancelled() or future.exception() is not None:
+            return
+        outcome: InsertOutcome = future.result()
+        journal.append(idx, phone, outcome)
+        index_status = INDEX_STATUS_BY_OUTCOME.get(outcome.status_label)
+        if import_index and index_status:
+            import_index.record(phone, str(input_path), index_status)
+
     inserted = 0
     skipped = 0
+    resumed = 0
+    interrupted = False
     failed: list[dict[str, Any]] = []
+    sender = LeadSender(
+        base_url=base_url,
+        endpoint=endpoint,
+        api_key=api_key,
+        headers=headers,
+        timeout=args.timeout,
+        check_existing=args.check_existing,
+        limiter=RateLimiter(args.max_rps),
+        existing_phones=existing_phones,
+    )
 
-    for idx, payload in enumerate(payloads, start=1):
-        phone = payload.get("clienteTelefono", "")
-        if args.check_existing and has_existing_record(base_url, phone, api_key, args.timeout):
-            skipped += 1
-            print(f"[{idx}/{len(payloads)}] SKIP teléfono existente: {phone}")
-            continue
-
-        status, response_payload = request_json(
-            "POST",
-            endpoint,
-            args.timeout,
-            headers=headers,
-            payload=payload,
-        )
-
-        if status in (200, 201):
-            inserted += 1
-            print(f"[{idx}/{len(payloads)}] OK {phone}")
-        else:
-            failed.append(
-                {
-                    "index": idx,
-                    "phone": phone,
-                    "status": status,
-                    "response": response_payload,
-                    "payload": payload,
-                }
-            )
-            print(f"[{idx}/{len(payloads)}] FAIL {phone} status={status}")
-
+    executor = ThreadPoolExecutor(max_workers=args.concurrency)
+    try:
+        last_by_phone: dict[str, Future] = {}
+        pending: deque[tuple[int, dict[str, Any], Future]] = deque()
+        max_pending = args.concurrency * batch_size * PENDING_SENDS_PER_WORKER
+        batch: list[tuple[dict[str, Any], Future]] = []
+
+        def flush_batch() -> None:
+            if not batch:
+                return
+            batch_payloads = [payload for payload, _ in batch]
+            item_futures = [item_future for _, item_future in batch]
+            # Un lote espera a los envíos previos de sus teléfonos, igual que en modo individual.
+            previous = [
+                last_by_phone[phone]
+                for phone in {payload.get("clienteTelefono", "") for payload in batch_payloads}
+                if phone in last_by_phone
+            ]
+            batch_future = executor.submit(sender.send_batch, batch_payloads, previous)
+            batch_future.add_done_callback(partial(fan_out_batch, item_futures=item_futures))
+            for payload, item_future in batch:
+                phone = payload.get("clienteTelefono", "")
+                if phone:
+                    last_by_phone[phone] = item_future
+            batch.clear()
+
+        def report_oldest() -> None:
+            """Espera el envío más antiguo e imprime su resultado, en el orden del archivo."""
+            nonlocal inserted, skipped, resumed
+            idx, payload, future = pending[0]
+            if batch and batch[0][1] is future:
+                flush_batch()
+            outcome: InsertOutcome = future.result()
+            pending.popleft()
+            phone = payload.get("clienteTelefono", "")
+            if last_by_phone.get(phone) is future:
+                del last_by_phone[phone]
+            progress = f"[{idx}/{total}]" if total else f"[{idx}]"
+            if outcome.status_label == "RESUMED":
+                resumed += 1
+            elif outcome.status_label == "KNOWN":
+                skipped += 1
+                print(f"{progress} SKIP teléfono ya importado (índice local): {phone}")
+            elif outcome.status_label == "SKIP":
+                skipped += 1
+                print(f"{progress} SKIP teléfono existente: {phone}")
+            elif outcome.status_label == "OK":
+                inserted += 1
+                print(f"{progress} OK {phone}")
+            else:
+                failed.append(
+                    {
+                        "index": idx,
+                        "phone": phone,
+                        "status": outcome.status,
+                        "response": outcome.response,
+                        "payload": payload,
+                    }
+                )
+                print(f"{progress} FAIL {phone} status={outcome.status}")
+
+        for idx, payload in enumerate(payloads, start=1):
+            # El progreso se imprime en el orden del archivo aunque terminen
+            # desordenados; la ventana acota los payloads retenidos en memoria.
+            while len(pending) >= max_pending:
+                report_oldest()
+            phone = payload.get("clienteTelefono", "")
+            if idx in completed_indexes:
+                future = Future()
+                future.set_result(InsertOutcome("RESUMED"))
+                pending.append((idx, payload, future))
+                continue
+            if normalize_target_phone(phone) in known_phones:
+                future = Future()
+                future.set_result(InsertOutcome("KNOWN"))
+            elif batch_size > 1:
+                # Un mismo teléfono no se repite dentro del lote para respetar --check-existing.
+                if phone and any(item.get("clienteTelefono") == phone for item, _ in batch):
+                    flush_batch()
+                future = Future()
+                batch.append((payload, future))
+                if len(batch) >= batch_size:
+                    flush_batch()
+            else:
+                future = executor.submit(sender.send, payload, last_by_phone.get(phone))
+                if phone:
+                    last_by_phone[phone] = future
+            # Bitácora e índice se actualizan al terminar cada envío, no al
+            # imprimirlo, para no perder envíos ya hechos si la corrida se interrumpe.
+            future.add_done_callback(partial(record_outcome, idx, phone))
+            pending.append((idx, payload, future))
+        flush_batch()
+        while pending:
+            report_oldest()
+    except KeyboardInterrupt:
+        interrupted = True
+        print("Interrumpido: se esperan los envíos en curso antes de salir.", file=sys.stderr)
+        executor.shutdown(wait=True, cancel_futures=True)
+    finally:
+        executor.shutdown(wait=True)
+        journal.close()
+
+    if import_index:
+        import_index.close()
+
+    if not materialized:
+        print_parse_summary()
     print("")
     print("Resumen importación")
     print(f"- Insertados: {inserted}")
     print(f"- Omitidos (existentes): {skipped}")
     print(f"- Fallidos: {len(failed)}")
+    if resumed:
+        print(f"- Ya procesados en corridas anteriores: {resumed}")
+    if interrupted:
+        print(f"- Corrida interrumpida; continúa con --resume (bitácora: {journal.path})")
 
     if failed:
         fail_path = Path("tmp/import_leads_failures.json")
         fail_path.parent.mkdir(parents=True, exist_ok=True)
         fail_path.write_text(json.dumps(failed, ensure_ascii=False, indent=2), encoding="utf-8")
         print(f"- Detalle de fallos: {fail_path}")
+    if errors:
+        print_parse_errors(errors)
+    if failed or errors:
         return 1
 
-    return 0
+    return 130 if interrupted else 0
 
 
 if __name__ == "__main__":
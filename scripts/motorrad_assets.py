@@ -0,0 +1,104 @@
+"""In-memory index of `imagenes_motos/` shared by the Motorrad scripts.
+
+`scrape_bmw_motorrad.py` used to probe up to eight `Path.exists()` variants per
+catalog entry (every extension, with and without the legacy `NNN_` prefix) and
+`normalize_moto_assets.py` globbed the directory again and stat'ed every file.
+`AssetIndex.scan` reads the directory once with `os.scandir` (file type comes
+from the directory entry, no extra stat) and answers both kinds of lookup from
+dicts. Callers report the files they write, delete or rename through `add`,
+`remove` and `rename`, so the index stays in sync without rescanning.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List
+
+LEGACY_PREFIX_PATTERN = re.compile(r"^(\d{3})[_-]+(.+)$")
+PARTIAL_DOWNLOAD_SUFFIX = ".part"
+
+
+def bare_stem(path: Path) -> str:
+    """Stem without the legacy `NNN_` ordering prefix."""
+    legacy_match = LEGACY_PREFIX_PATTERN.match(path.stem)
+    return legacy_match.group(2) if legacy_match else path.stem
+
+
+class AssetIndex:
+    """Files of one directory by name and by `key(bare stem)`, in directory order.
+
+    Hidden files are not assets; temporary `.part` downloads are kept apart in
+    `partials` so they can be cleaned up without another scan.
+    """
+
+    def __init__(self, directory: Path, key: Callable[[str], str] | None = None) -> None:
+        self.directory = directory
+        self.key = key or (lambda stem: stem)
+        self.by_name: Dict[str, Path] = {}
+        self.by_key: Dict[str, List[Path]] = {}
+        self.partials: List[Path] = []
+
+    @classmethod
+    def scan(cls, directory: Path, key: Callable[[str], str] | None = None) -> "AssetIndex":
+        index = cls(directory, key)
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.startswith("."):
+                        if entry.name.endswith(PARTIAL_DOWNLOAD_SUFFIX):
+                            index.partials.append(directory / entry.name)
+                        continue
+                    if entry.is_file():
+                        index.add(directory / entry.name)
+        except FileNotFoundError:
+            pass
+        return index
+
+    def __contains__(self, path: Path) -> bool:
+        return path.parent == self.directory and path.name in self.by_name
+
+    def __iter__(self) -> Iterator[Path]:
+        return iter(list(self.by_name.values()))
+
+    def __len__(self) -> int:
+        return len(self.by_name)
+
+    def add(self, path: Path) -> None:
+        if path.name in self.by_name:
+            return
+        self.by_name[path.name] = path
+        self.by_key.setdefault(self.key(bare_stem(path)), []).append(path)
+
+    def remove(self, path: Path) -> None:
+        if self.by_name.pop(path.name, None) is None:
+            return
+        key = self.key(bare_stem(path))
+        remaining = [candidate for candidate in self.by_key.get(key, []) if candidate != path]
+        if remaining:
+            self.by_key[key] = remaining
+        else:
+            self.by_key.pop(key, None)
+
+    def rename(self, source: Path, target: Path) -> None:
+        self.remove(source)
+        self.add(target)
+
+    def matches(self, key: str) -> List[Path]:
+        return self.by_key.get(key, [])
+
+    def find(self, slug: str, extensions: tuple, order: int | None = None) -> Path | None:
+        """First `slug{ext}` in `extensions` order, then the legacy `{order:03d}_slug{ext}`."""
+        if not slug:
+            return None
+        for extension in extensions:
+            path = self.by_name.get(f"{slug}{extension}")
+            if path:
+                return path
+        if order is not None:
+            for extension in extensions:
+                path = self.by_name.get(f"{order:03d}_{slug}{extension}")
+                if path:
+                    return path
+        return None
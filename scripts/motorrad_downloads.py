@@ -0,0 +1,211 @@
+"""Download queue for `scrape_bmw_motorrad.py`.
+
+Replaces the manual `--chunk-size/--chunk-index` batches: every pending image
+goes into one queue served by `workers` threads that share a byte-rate limit,
+retry transient failures with exponential backoff and record each outcome in a
+JSON state file. The state is rewritten (atomically) after every finished
+download, so a run that is killed resumes with only the images still missing.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Sequence
+
+import requests
+
+STATE_VERSION = 1
+DEFAULT_MAX_ATTEMPTS = 5
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+BYTE_RATE_SUFFIXES = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3}
+
+
+def parse_byte_rate(value: str) -> float:
+    """Parse "500000", "800K" or "2M" (bytes per second); 0 disables the limit."""
+    text = value.strip().upper().removesuffix("B")
+    suffix = text[-1:] if text[-1:] in BYTE_RATE_SUFFIXES else ""
+    number = float(text[: len(text) - len(suffix)])
+    if number < 0:
+        raise ValueError(value)
+    return number * BYTE_RATE_SUFFIXES[suffix]
+
+
+class ByteRateLimiter:
+    """Token bucket in bytes shared by every download thread.
+
+    `consume` charges the bytes already received and sleeps for the debt, so the
+    aggregate throughput stays at `bytes_per_second` whatever the worker count.
+    """
+
+    def __init__(self, bytes_per_second: float) -> None:
+        self.rate = bytes_per_second
+        self._tokens = bytes_per_second  # allow a one-second burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount: int) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+
+@dataclass
+class DownloadJob:
+    key: str  # path relative to the project, also the key in the state file
+    filename: str  # photo name in the Fasecolda API
+    path: Path
+
+
+@dataclass
+class DownloadOutcome:
+    job: DownloadJob
+    attempts: int
+    sha256: str = ""
+    error: Exception | None = None
+
+
+class DownloadState:
+    """Per-image status persisted as JSON: pending, done or failed (+ attempts, sha256).
+
+    Completed entries also keep the file size and mtime, so later runs can reuse
+    the recorded SHA-256 of an unchanged image instead of hashing it again.
+    """
+
+    def __init__(self, path: Path | None) -> None:
+        self.path = path
+        self.downloads: Dict[str, dict] = {}
+        if path and path.exists():
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                data = {}
+            if data.get("version") == STATE_VERSION:
+                self.downloads = data.get("downloads", {})
+
+    def pending_from_previous_run(self) -> int:
+        return sum(1 for item in self.downloads.values() if item.get("status") != "done")
+
+    def stored_sha256(self, key: str, stat: os.stat_result) -> str | None:
+        """Recorded SHA-256 of `key` if the file still has the recorded size and mtime."""
+        item = self.downloads.get(key)
+        if not item or item.get("status") != "done" or not item.get("sha256"):
+            return None
+        if item.get("bytes") != stat.st_size or item.get("mtime_ns") != stat.st_mtime_ns:
+            return None
+        return item["sha256"]
+
+    def mark_file(
+        self, key: str, filename: str, path: Path, sha256: str, **fields: object
+    ) -> None:
+        """Record `path` as done with its hash, size and mtime."""
+        stat = path.stat()
+        self.mark(
+            key,
+            filename=filename,
+            status="done",
+            sha256=sha256,
+            bytes=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+            error="",
+            **fields,
+        )
+
+    def mark(self, key: str, **fields: object) -> None:
+        item = self.downloads.setdefault(key, {})
+        item.update(fields)
+        item["updated"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        document = {"version": STATE_VERSION, "downloads": self.downloads}
+        partial_path = self.path.with_name(f"{self.path.name}.tmp")
+        partial_path.write_text(
+            json.dumps(document, indent=2, ensure_ascii=False, sort_keys=True), encoding="utf-8"
+        )
+        os.replace(partial_path, self.path)
+
+
+def backoff_delay(exc: Exception, attempt: int) -> float:
+    """Honour a numeric Retry-After header, otherwise back off exponentially."""
+    response = getattr(exc, "response", None)
+    if response is not None:
+        try:
+            return min(max(float(response.headers.get("Retry-After", "")), 0.0), BACKOFF_MAX_SECONDS)
+        except ValueError:
+            pass
+    return min(BACKOFF_BASE_SECONDS * 2**attempt, BACKOFF_MAX_SECONDS)
+
+
+def is_retryable(exc: Exception) -> bool:
+    response = getattr(exc, "response", None)
+    if response is not None:
+        return response.status_code in RETRYABLE_STATUS
+    # Connection resets, timeouts and truncated/invalid bodies.
+    return isinstance(exc, (requests.RequestException, OSError))
+
+
+def run_with_retries(
+    job: DownloadJob, download: Callable[[DownloadJob], str], max_attempts: int
+) -> DownloadOutcome:
+    for attempt in range(max_attempts):
+        try:
+            return DownloadOutcome(job, attempt + 1, sha256=download(job))
+        except Exception as exc:  # noqa: BLE001 - reported through the outcome
+            if attempt + 1 >= max_attempts or not is_retryable(exc):
+                return DownloadOutcome(job, attempt + 1, error=exc)
+            time.sleep(backoff_delay(exc, attempt))
+    raise AssertionError("max_attempts must be positive")
+
+
+def run_download_queue(
+    jobs: Sequence[DownloadJob],
+    download: Callable[[DownloadJob], str],
+    state: DownloadState,
+    workers: int,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+) -> Iterator[DownloadOutcome]:
+    """Download every job and yield outcomes as they finish, persisting the state each time."""
+    for job in jobs:
+        state.mark(job.key, filename=job.filename, status="pending")
+    state.save()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_with_retries, job, download, max_attempts) for job in jobs]
+        try:
+            for future in as_completed(futures):
+                outcome = future.result()
+                if outcome.error is None:
+                    job = outcome.job
+                    state.mark_file(
+                        job.key, job.filename, job.path, outcome.sha256, attempts=outcome.attempts
+                    )
+                else:
+                    state.mark(
+                        outcome.job.key,
+                        status="failed",
+                        attempts=outcome.attempts,
+                        error=str(outcome.error),
+                    )
+                state.save()
+                yield outcome
+        finally:
+            # On Ctrl+C do not start the downloads still queued.
+            for future in futures:
+                future.cancel()
@@ -16,7 +16,9 @@ import re
 import unicodedata
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Sequence
+from typing import List, Optional, Sequence
+
+from motorrad_assets import LEGACY_PREFIX_PATTERN, AssetIndex
 
 ROOT_DIR = Path(__file__).resolve().parent.parent
 IMAGES_DIR = ROOT_DIR / "imagenes_motos"
@@ -29,7 +31,6 @@ IMAGE_TYPE_EXT = {
     "webp": ".webp",
 }
 
-LEGACY_PREFIX_PATTERN = re.compile(r"^(\d{3})[_-]+(.+)$")
 ALLOWED_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
 
 
@@ -64,21 +65,12 @@ def detect_extension(path: Path) -> str:
     return ".jpg"
 
 
-def build_asset_index(paths: Iterable[Path]) -> Dict[str, List[Path]]:
-    index: Dict[str, List[Path]] = {}
-    for path in paths:
-        if not path.is_file():
-            continue
-        stem = path.stem
-        legacy_match = LEGACY_PREFIX_PATTERN.match(stem)
-        if legacy_match:
-            stem = legacy_match.group(2)
-        key = normalize_key(stem)
-        index.setdefault(key, []).append(path)
-    return index
+def build_asset_index() -> AssetIndex:
+    """Scan `imagenes_motos/` once, keyed by the normalized stem without legacy prefix."""
+    return AssetIndex.scan(IMAGES_DIR, key=normalize_key)
 
 
-def find_asset_for_record(record: dict, index: Dict[str, List[Path]]) -> Optional[Path]:
+def find_asset_for_record(record: dict, index: AssetIndex) -> Optional[Path]:
     candidates: List[str] = []
     slug = record.get("image_slug")
     if slug:
@@ -122,7 +114,7 @@ def find_asset_for_record(record: dict, index: Dict[str, List[Path]]) -> Optiona
         if not key or key in seen_keys:
             continue
         seen_keys.add(key)
-        matches = index.get(key)
+        matches = index.matches(key)
         if not matches:
             continue
         if len(matches) == 1:
@@ -134,18 +126,20 @@ def find_asset_for_record(record: dict, index: Dict[str, List[Path]]) -> Optiona
     return None
 
 
-def rename_asset(path: Path, desired_stem: str, extension: str) -> Path:
+def rename_asset(index: AssetIndex, path: Path, desired_stem: str, extension: str) -> Path:
+    """Move `path` to `desired_stem + extension` (deduplicating) and update `index`."""
     base_stem = desired_stem or path.stem
     target = IMAGES_DIR / f"{base_stem}{extension}"
 
-    if target.exists() and target != path:
+    if target in index and target != path:
         if target.read_bytes() == path.read_bytes():
             path.unlink(missing_ok=True)
+            index.remove(path)
             return target
         counter = 1
         while True:
             candidate = IMAGES_DIR / f"{base_stem}-{counter}{extension}"
-            if not candidate.exists():
+            if candidate not in index:
                 target = candidate
                 break
             counter += 1
@@ -153,14 +147,14 @@ def rename_asset(path: Path, desired_stem: str, extension: str) -> Path:
     if target != path:
         target.parent.mkdir(parents=True, exist_ok=True)
         path.rename(target)
+        index.rename(path, target)
         return target
 
     return path
 
 
 def normalize_records(records: Sequence[dict]) -> dict:
-    assets = list(IMAGES_DIR.glob("*"))
-    index = build_asset_index(assets)
+    index = build_asset_index()
     updated_records: List[dict] = []
     renamed_files: List[Path] = []
     extension_updates: List[tuple[Path, str]] = []
@@ -168,7 +162,7 @@ def normalize_records(records: Sequence[dict]) -> dict:
 
     for record in records:
         asset_path = find_asset_for_record(record, index)
-        if not asset_path or not asset_path.exists():
+        if not asset_path:
             missing_assets.append(record)
             record["image_filename"] = ""
             record["image_path"] = ""
@@ -184,21 +178,12 @@ def normalize_records(records: Sequence[dict]) -> dict:
         if legacy_match:
             desired_stem = slugify(legacy_match.group(2))
 
-        original_key = normalize_key(asset_path.stem)
-        if original_key in index:
-            index[original_key] = [p for p in index[original_key] if p != asset_path]
-            if not index[original_key]:
-                index.pop(original_key)
-
-        new_path = rename_asset(asset_path, desired_stem, detected_ext)
+        new_path = rename_asset(index, asset_path, desired_stem, detected_ext)
         if new_path != asset_path:
             renamed_files.append(new_path)
             if extension_changed:
                 extension_updates.append((new_path, detected_ext))
 
-        new_key = normalize_key(new_path.stem)
-        index.setdefault(new_key, []).append(new_path)
-
         try:
             relative_path = new_path.relative_to(ROOT_DIR)
         except ValueError:
@@ -207,7 +192,7 @@ def normalize_records(records: Sequence[dict]) -> dict:
         record["image_filename"] = new_path.name
         record["image_path"] = str(relative_path)
         record["image_slug"] = new_path.stem
-        record["image_downloaded"] = new_path.exists()
+        record["image_downloaded"] = new_path in index
         updated_records.append(record)
 
     summary = {
@@ -20,16 +20,30 @@ from __future__ import annotations
 
 import argparse
 import csv
+import hashlib
 import json
 import os
 import re
+import tempfile
+import time
 import unicodedata
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, List, Sequence
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from motorrad_assets import PARTIAL_DOWNLOAD_SUFFIX, AssetIndex
+from motorrad_downloads import (
+    DEFAULT_MAX_ATTEMPTS,
+    ByteRateLimiter,
+    DownloadJob,
+    DownloadState,
+    parse_byte_rate,
+    run_download_queue,
+)
 
 # Constants for local project structure
 ROOT_DIR = Path(__file__).resolve().parent.parent
@@ -37,14 +51,30 @@ HTML_CATALOG = ROOT_DIR / "Registro-clientes-87.html"
 IMAGES_DIR = ROOT_DIR / "imagenes_motos"
 CSV_OUTPUT = ROOT_DIR / "bmw_motorrad_referencias.csv"
 JSON_OUTPUT = ROOT_DIR / "bmw_motorrad_referencias.json"
+DOWNLOAD_STATE = ROOT_DIR / "tmp" / "motorrad_downloads_state.json"
+CATALOG_CACHE = ROOT_DIR / "tmp" / "motorrad_catalog_cache.json"
 
 ASSET_ALLOWED_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+ASSET_SEARCH_EXTENSIONS = (".jpg", ".png", ".webp", ".jpeg")  # lookup priority
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+DEFAULT_DOWNLOAD_WORKERS = 8
 
 # API endpoints and configuration
 TOKEN_URL = "https://guiadevalores.fasecolda.com/apifasecolda/token"
 API_BASE_URL = "https://guiadevalores.fasecolda.com/apifasecolda/api"
 PHOTO_BASE_URL = "https://guiadevalores.fasecolda.com/ConsultaFotos/"
 TIPOLOGIA_IDS = list(range(16, 24))  # Tipologías asociadas a la categoría Motos
+API_PAGE_SIZE = 500
+# Paging metadata the search endpoint may include next to "items".
+API_TOTAL_PAGES_KEYS = ("totalPages", "TotalPages", "pageCount")
+API_TOTAL_ITEMS_KEYS = (
+    "totalItems",
+    "TotalItems",
+    "totalCount",
+    "TotalCount",
+    "totalRecords",
+    "total",
+)
 
 ENV_API_USERNAME = "FASECOLDA_API_USERNAME"
 ENV_API_PASSWORD = "FASECOLDA_API_PASSWORD"
@@ -95,6 +125,7 @@ class ApiEntry:
         photo_path: Path | None,
         downloaded: bool,
         image_url: str | None,
+        image_sha256: str = "",
     ) -> dict:
         referencia_uno = self.data.get("referenciaUno", "")
         referencia_dos = self.data.get("referenciaDos", "")
@@ -114,34 +145,37 @@ class ApiEntry:
             "image_slug": slug,
             "image_url": image_url or "",
             "image_downloaded": downloaded,
+            "image_sha256": image_sha256,
         }
 
 
-def read_catalog_models(html_path: Path) -> List[CatalogEntry]:
-    """Extract BMW Motorrad models preserving the order defined in the catalog."""
-    content = html_path.read_text(encoding="utf-8")
-    key = "bmwMotorrad:"
+CATALOG_BLOCK_KEY = "bmwMotorrad:"
+CATALOG_CACHE_VERSION = 1
+BRACE_PATTERN = re.compile(r"[{}]")
+# Inside a `modelos: [...]` array only single-quoted strings and brackets matter.
+MODELOS_TOKEN_PATTERN = re.compile(r"'([^']*)'|\[|\]")
+
+
+def catalog_block(content: str) -> str:
+    """Return the `bmwMotorrad: {...}` object, matching braces like a plain counter."""
     try:
-        start = content.index(key)
+        start = content.index(CATALOG_BLOCK_KEY)
     except ValueError as exc:  # pragma: no cover - defensive guard
         raise RuntimeError("No se encontró el bloque bmwMotorrad en el HTML") from exc
-
-    # Locate the full object scope by matching braces
     brace_start = content.index("{", start)
-    depth = 1
-    pos = brace_start + 1
-    while depth > 0 and pos < len(content):
-        char = content[pos]
-        if char == "{":
-            depth += 1
-        elif char == "}":
-            depth -= 1
-        pos += 1
-    block = content[brace_start:pos]
+    depth = 0
+    for match in BRACE_PATTERN.finditer(content, brace_start):
+        depth += 1 if match.group() == "{" else -1
+        if depth == 0:
+            return content[brace_start : match.end()]
+    return content[brace_start:]
 
+
+def parse_catalog_models(content: str) -> List[CatalogEntry]:
+    """Extract BMW Motorrad models preserving the order defined in the catalog."""
+    block = catalog_block(content)
     entries: List[CatalogEntry] = []
     idx = 0
-    order = 1
     while True:
         modelos_idx = block.find("modelos:", idx)
         if modelos_idx == -1:
@@ -149,31 +183,50 @@ def read_catalog_models(html_path: Path) -> List[CatalogEntry]:
         idx = block.find("[", modelos_idx)
         if idx == -1:
             break
-        idx += 1
-        depth = 1
-        inside_string = False
-        current = []
-        while idx < len(block) and depth > 0:
-            ch = block[idx]
-            if inside_string:
-                if ch == "'":
-                    inside_string = False
-                    label = "".join(current).strip()
-                    if label:
-                        entries.append(CatalogEntry(order=order, label=label))
-                        order += 1
-                    current = []
-                else:
-                    current.append(ch)
+        depth = 0
+        for match in MODELOS_TOKEN_PATTERN.finditer(block, idx):
+            token = match.group()
+            if token == "[":
+                depth += 1
+            elif token == "]":
+                depth -= 1
             else:
-                if ch == "'":
-                    inside_string = True
-                elif ch == "[":
-                    depth += 1
-                elif ch == "]":
-                    depth -= 1
-            idx += 1
-        # continue searching from current position
+                label = match.group(1).strip()
+                if label:
+                    entries.append(CatalogEntry(order=len(entries) + 1, label=label))
+            idx = match.end()
+            if depth == 0:
+                break
+        else:
+            break
+    return entries
+
+
+def read_catalog_models(
+    html_path: Path, cache_path: Path | None = CATALOG_CACHE
+) -> List[CatalogEntry]:
+    """Catalog entries of `html_path`, reusing the cached parse while the HTML is unchanged."""
+    raw = html_path.read_bytes()
+    digest = hashlib.sha256(raw).hexdigest()
+    if cache_path and cache_path.exists():
+        try:
+            cached = json.loads(cache_path.read_text(encoding="utf-8"))
+            if cached.get("version") == CATALOG_CACHE_VERSION and cached.get("sha256") == digest:
+                return [CatalogEntry(order=order, label=label) for order, label in cached["entries"]]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass  # unreadable cache: parse again and overwrite it
+
+    entries = parse_catalog_models(raw.decode("utf-8"))
+    if cache_path:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        document = {
+            "version": CATALOG_CACHE_VERSION,
+            "sha256": digest,
+            "entries": [[entry.order, entry.label] for entry in entries],
+        }
+        partial_path = cache_path.with_name(f"{cache_path.name}.tmp")
+        partial_path.write_text(json.dumps(document, ensure_ascii=False), encoding="utf-8")
+        os.replace(partial_path, cache_path)
     return entries
 
 
@@ -202,14 +255,40 @@ def get_api_token(session: requests.Session, username: str, password: str) -> st
     return response.json()["access_token"]
 
 
-def fetch_bmw_api_entries(session: requests.Session, token: str) -> Dict[str, ApiEntry]:
-    headers = {"Authorization": f"Bearer {token}"}
-    entries: Dict[str, ApiEntry] = {}
-    for tipologia_id in TIPOLOGIA_IDS:
+def reported_page_count(payload: dict, page_size: int) -> int | None:
+    """Pages the API says the result set has, from a page count or a total item count."""
+    for key in API_TOTAL_PAGES_KEYS:
+        value = payload.get(key)
+        if isinstance(value, int) and value >= 0:
+            return value
+    for key in API_TOTAL_ITEMS_KEYS:
+        value = payload.get(key)
+        if isinstance(value, int) and value >= 0:
+            return -(-value // max(page_size, 1))
+    return None
+
+
+def fetch_tipologia_items(
+    session: requests.Session, headers: Dict[str, str], tipologia_id: int
+) -> List[dict]:
+    """Return every item of one tipología, following pages until the result set is exhausted.
+
+    When the response reports the page or item total, that alone decides where to
+    stop. Otherwise a short page is the last one, and a page with no new codes
+    (or, without codes, the same items as the page before) means the API
+    ignored PageNumber. Only items with a `codigo` are deduplicated.
+    """
+    items: List[dict] = []
+    seen_codes: set = set()
+    previous_page: List[dict] = []
+    total_pages: int | None = None
+    page = 1
+    while True:
         params = {
             "CategoriaId": 3,
             "EstadoId": 1,
-            "PageSize": 500,
+            "PageNumber": page,
+            "PageSize": API_PAGE_SIZE,
             "TipologiaId": tipologia_id,
         }
         response = session.get(
@@ -219,7 +298,48 @@ def fetch_bmw_api_entries(session: requests.Session, token: str) -> Dict[str, Ap
             timeout=60,
         )
         response.raise_for_status()
-        items = response.json().get("items", [])
+        payload = response.json()
+        page_items = payload.get("items", [])
+        if total_pages is None:
+            # The server may cap PageSize, so count pages with the size it actually served.
+            served_size = len(page_items) if page == 1 else API_PAGE_SIZE
+            total_pages = reported_page_count(payload, served_size)
+        page_codes = {item["codigo"] for item in page_items if item.get("codigo")}
+        new_codes = page_codes - seen_codes
+        if total_pages is None and page > 1 and page_items:
+            repeated = not new_codes if page_codes else page_items == previous_page
+            if repeated:
+                break
+        for item in page_items:
+            codigo = item.get("codigo")
+            if codigo:
+                if codigo in seen_codes:
+                    continue
+                seen_codes.add(codigo)
+            items.append(item)
+        if total_pages is not None:
+            if page >= total_pages or not page_items:
+                break
+        elif len(page_items) < API_PAGE_SIZE:
+            break
+        previous_page = page_items
+        page += 1
+    return items
+
+
+def fetch_bmw_api_entries(session: requests.Session, token: str) -> Dict[str, ApiEntry]:
+    headers = {"Authorization": f"Bearer {token}"}
+    with ThreadPoolExecutor(max_workers=len(TIPOLOGIA_IDS)) as executor:
+        # map() returns the tipologías in TIPOLOGIA_IDS order regardless of which finishes first.
+        items_by_tipologia = list(
+            executor.map(
+                lambda tipologia_id: fetch_tipologia_items(session, headers, tipologia_id),
+                TIPOLOGIA_IDS,
+            )
+        )
+
+    entries: Dict[str, ApiEntry] = {}
+    for items in items_by_tipologia:
         for item in items:
             if item.get("marca") != "BMW":
                 continue
@@ -236,11 +356,136 @@ def fetch_bmw_api_entries(session: requests.Session, token: str) -> Dict[str, Ap
     return entries
 
 
-def download_image(session: requests.Session, filename: str, target_path: Path) -> None:
+def configure_connection_pool(session: requests.Session, size: int) -> None:
+    """Keep up to `size` keep-alive connections per host so every worker thread gets one."""
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(DOWNLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fsync_directory(directory: Path) -> None:
+    """Flush `directory` so a rename inside it survives a crash (no-op where unsupported)."""
+    try:
+        descriptor = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return  # Windows cannot open directories
+    try:
+        os.fsync(descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
+
+
+def previous_image_hashes(json_path: Path) -> tuple[Dict[str, str], int]:
+    """`image_path -> image_sha256` from the last JSON output, plus that file's mtime."""
+    try:
+        records = json.loads(json_path.read_text(encoding="utf-8"))
+        mtime_ns = json_path.stat().st_mtime_ns
+    except (OSError, ValueError):
+        return {}, 0
+    hashes = {
+        record["image_path"]: record["image_sha256"]
+        for record in records
+        if isinstance(record, dict) and record.get("image_path") and record.get("image_sha256")
+    }
+    return hashes, mtime_ns
+
+
+def existing_image_sha256(
+    state: DownloadState,
+    key: str,
+    filename: str,
+    path: Path,
+    previous: tuple[Dict[str, str], int],
+) -> str:
+    """SHA-256 of an image already on disk, hashing it only when no stored value is still valid.
+
+    The state file keeps size and mtime next to each hash. The previous JSON only
+    has the hash, so it is trusted when the image is not newer than that JSON.
+    Either way the result goes into the state so the next run skips the hash.
+    """
+    stat = path.stat()
+    digest = state.stored_sha256(key, stat)
+    if digest:
+        return digest
+    previous_hashes, previous_mtime_ns = previous
+    digest = previous_hashes.get(key, "")
+    if not digest or stat.st_mtime_ns > previous_mtime_ns:
+        digest = file_sha256(path)
+    state.mark_file(key, filename, path, digest)
+    return digest
+
+
+def download_image(
+    session: requests.Session,
+    filename: str,
+    target_path: Path,
+    limiter: ByteRateLimiter | None = None,
+) -> str:
+    """Stream the photo to a temporary file and move it into place once complete.
+
+    The body is written in chunks (memory stays flat regardless of image size),
+    checked against Content-Length, fsynced and atomically renamed (then the
+    directory is fsynced too), so an interrupted run never leaves a truncated
+    file under the final name that `find_existing_asset` would accept. Returns
+    the SHA-256 of the saved file.
+    """
     url = f"{PHOTO_BASE_URL}{filename}"
-    response = session.get(url, timeout=60)
-    response.raise_for_status()
-    target_path.write_bytes(response.content)
+    digest = hashlib.sha256()
+    size = 0
+    with session.get(url, timeout=60, stream=True) as response:
+        response.raise_for_status()
+        expected_size = response.headers.get("Content-Length")
+        if response.headers.get("Content-Encoding", "identity") != "identity":
+            expected_size = None  # Content-Length counts the encoded body, not the image
+        with tempfile.NamedTemporaryFile(
+            dir=target_path.parent,
+            prefix=f".{target_path.name}.",
+            suffix=PARTIAL_DOWNLOAD_SUFFIX,
+            delete=False,
+        ) as handle:
+            partial_path = Path(handle.name)
+            try:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    handle.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+                    if limiter:
+                        limiter.consume(len(chunk))
+                handle.flush()
+                os.fsync(handle.fileno())
+                written_size = os.fstat(handle.fileno()).st_size
+            except BaseException:
+                handle.close()
+                partial_path.unlink(missing_ok=True)
+                raise
+    if size == 0 or written_size != size or (expected_size and int(expected_size) != size):
+        partial_path.unlink(missing_ok=True)
+        raise IOError(
+            f"Descarga incompleta de {filename}: {size} bytes recibidos, "
+            f"{expected_size or 'tamaño desconocido'} esperados"
+        )
+    os.replace(partial_path, target_path)
+    fsync_directory(target_path.parent)
+    return digest.hexdigest()
+
+
+def remove_partial_downloads(assets: AssetIndex) -> int:
+    """Delete temporary files left by a run that was interrupted mid-download."""
+    for partial_path in assets.partials:
+        partial_path.unlink(missing_ok=True)
+    removed = len(assets.partials)
+    assets.partials.clear()
+    return removed
 
 
 def determine_extension(filename: str) -> str:
@@ -254,21 +499,8 @@ def determine_extension(filename: str) -> str:
     return ".jpg"
 
 
-def find_existing_asset(slug: str, order: int | None = None) -> Path | None:
-    if not slug:
-        return None
-    search_extensions = (".jpg", ".png", ".webp", ".jpeg")
-    for extension in search_extensions:
-        candidate = IMAGES_DIR / f"{slug}{extension}"
-        if candidate.exists():
-            return candidate
-    if order is not None:
-        prefix = f"{order:03d}_"
-        for extension in search_extensions:
-            legacy_candidate = IMAGES_DIR / f"{prefix}{slug}{extension}"
-            if legacy_candidate.exists():
-                return legacy_candidate
-    return None
+def find_existing_asset(assets: AssetIndex, slug: str, order: int | None = None) -> Path | None:
+    return assets.find(slug, ASSET_SEARCH_EXTENSIONS, order)
 
 
 def as_relative_path(path: Path | None) -> Path | None:
@@ -295,18 +527,36 @@ def parse_args() -> argparse.Namespace:
         description="Descarga metadatos e imágenes de la línea BMW Motorrad desde fasecolda.com"
     )
     parser.add_argument(
-        "--chunk-size",
+        "--download-workers",
         type=int,
-        default=None,
+        default=DEFAULT_DOWNLOAD_WORKERS,
+        help=f"Descargas de imágenes en paralelo (por defecto {DEFAULT_DOWNLOAD_WORKERS}).",
+    )
+    parser.add_argument(
+        "--max-bytes-per-second",
+        type=parse_byte_rate,
+        default=0.0,
         help=(
-            "Cantidad de referencias por lote de descarga. Si se omite, se intenta descargar todo en una sola ejecución."
+            "Límite de ancho de banda compartido por todas las descargas, en bytes por segundo "
+            "(acepta sufijos K/M, p. ej. 800K o 2M; 0 = sin límite)."
         ),
     )
     parser.add_argument(
-        "--chunk-index",
+        "--max-attempts",
         type=int,
-        default=0,
-        help="Índice (basado en cero) del lote a descargar cuando se usa --chunk-size.",
+        default=DEFAULT_MAX_ATTEMPTS,
+        help=(
+            "Intentos por imagen ante errores de red, 429 o 5xx, con espera exponencial "
+            f"(por defecto {DEFAULT_MAX_ATTEMPTS})."
+        ),
+    )
+    parser.add_argument(
+        "--state-file",
+        default=str(DOWNLOAD_STATE),
+        help=(
+            "Archivo JSON con el estado de cada descarga; permite retomar una ejecución "
+            "interrumpida ('' para no guardarlo)."
+        ),
     )
     parser.add_argument(
         "--skip-download",
@@ -332,10 +582,10 @@ def parse_args() -> argparse.Namespace:
 
 def main() -> None:
     args = parse_args()
-    if args.chunk_size is not None and args.chunk_size <= 0:
-        raise SystemExit("--chunk-size debe ser un entero positivo")
-    if args.chunk_index < 0:
-        raise SystemExit("--chunk-index no puede ser negativo")
+    if args.download_workers <= 0:
+        raise SystemExit("--download-workers debe ser un entero positivo")
+    if args.max_attempts <= 0:
+        raise SystemExit("--max-attempts debe ser un entero positivo")
 
     api_username = args.api_username or os.environ.get(ENV_API_USERNAME)
     api_password = args.api_password or os.environ.get(ENV_API_PASSWORD)
@@ -348,28 +598,26 @@ def main() -> None:
     catalog_entries = read_catalog_models(HTML_CATALOG)
     print(f"Referencias catalogadas: {len(catalog_entries)}")
 
-    chunk_start = None
-    chunk_end = None
-    if args.chunk_size is not None:
-        chunk_start = args.chunk_size * args.chunk_index
-        chunk_end = chunk_start + args.chunk_size
-        print(
-            f"Descargando lote {args.chunk_index} (índices {chunk_start + 1} a {min(chunk_end, len(catalog_entries))})"
-        )
-
     with requests.Session() as session:
+        configure_connection_pool(session, max(args.download_workers, len(TIPOLOGIA_IDS)))
         token = get_api_token(session, api_username, api_password)
         api_entries = fetch_bmw_api_entries(session, token)
         print(f"Registros BMW obtenidos del API: {len(api_entries)}")
 
         IMAGES_DIR.mkdir(exist_ok=True)
+        assets = AssetIndex.scan(IMAGES_DIR)
+        removed_partials = remove_partial_downloads(assets)
+        if removed_partials:
+            print(f"Se eliminaron {removed_partials} descargas incompletas de ejecuciones previas.")
 
+        state = DownloadState(Path(args.state_file) if args.state_file else None)
+        previous_hashes = previous_image_hashes(JSON_OUTPUT)
         records: List[dict] = []
         missing: List[CatalogEntry] = []
         without_image: List[CatalogEntry] = []
-        download_jobs: List[tuple[str, Path, CatalogEntry]] = []
+        download_jobs: List[DownloadJob] = []
+        entry_by_key: Dict[str, CatalogEntry] = {}
         record_by_path: Dict[Path, dict] = {}
-        pending_downloads: List[CatalogEntry] = []
 
         for entry in catalog_entries:
             api_entry = api_entries.get(entry.normalized)
@@ -380,25 +628,27 @@ def main() -> None:
             slug = slugify(entry.label)
             photo_path = None
             relative_photo_path = None
+            image_sha256 = ""
             if foto_nombre:
-                existing_asset = find_existing_asset(slug, entry.order)
+                existing_asset = find_existing_asset(assets, slug, entry.order)
                 if existing_asset:
                     photo_path = existing_asset
                 else:
                     extension = determine_extension(foto_nombre)
                     photo_path = IMAGES_DIR / f"{slug}{extension}"
                 relative_photo_path = as_relative_path(photo_path)
-                already_downloaded = photo_path.exists()
+                already_downloaded = photo_path in assets
                 image_url = f"{PHOTO_BASE_URL}{foto_nombre}"
-                should_download = (
-                    not args.skip_download
-                    and not already_downloaded
-                    and (chunk_start is None or chunk_start <= entry.order - 1 < chunk_end)
-                )
-                if should_download:
-                    download_jobs.append((foto_nombre, photo_path, entry))
-                elif not already_downloaded and not args.skip_download:
-                    pending_downloads.append(entry)
+                key = str(relative_photo_path)
+                if already_downloaded:
+                    # Downloads are atomic, so an existing file is a complete one.
+                    image_sha256 = existing_image_sha256(
+                        state, key, foto_nombre, photo_path, previous_hashes
+                    )
+                elif not args.skip_download:
+                    job = DownloadJob(key, foto_nombre, photo_path)
+                    download_jobs.append(job)
+                    entry_by_key[job.key] = entry
             else:
                 without_image.append(entry)
                 image_url = ""
@@ -407,41 +657,67 @@ def main() -> None:
                 entry.order,
                 slug,
                 relative_photo_path,
-                downloaded=photo_path.exists() if photo_path else False,
+                downloaded=already_downloaded,
                 image_url=image_url,
+                image_sha256=image_sha256,
             )
             if photo_path is not None:
                 record_by_path[photo_path] = record
             records.append(record)
 
+        state.save()
         failed_downloads: List[tuple[CatalogEntry, Exception]] = []
         if download_jobs:
-            with ThreadPoolExecutor(max_workers=8) as executor:
-                futures = {
-                    executor.submit(download_image, session, filename, path): (filename, path, entry)
-                    for filename, path, entry in download_jobs
-                }
-                for future in as_completed(futures):
-                    filename, path, entry = futures[future]
-                    try:
-                        future.result()
-                        record = record_by_path.get(path)
-                        if record:
-                            record["image_downloaded"] = True
-                    except Exception as exc:  # pragma: no cover - log and continue
-                        failed_downloads.append((entry, exc))
-                        without_image.append(entry)
-                        record = record_by_path.get(path)
-                        if record:
-                            record["image_filename"] = ""
-                            record["image_path"] = ""
-                            record["image_downloaded"] = False
-                        print(f"[WARN] Falló la descarga de {filename} ({entry.label}): {exc}")
-
-        if pending_downloads:
+            resumed = state.pending_from_previous_run()
+            if resumed:
+                print(f"Retomando ejecución previa: {resumed} descargas no completadas.")
+            limiter = (
+                ByteRateLimiter(args.max_bytes_per_second) if args.max_bytes_per_second > 0 else None
+            )
+            print(
+                f"Descargando {len(download_jobs)} imágenes con {args.download_workers} hilos"
+                + (f" (máx. {args.max_bytes_per_second / 1024:.0f} KB/s)" if limiter else "")
+            )
+
+            def download(job: DownloadJob) -> str:
+                return download_image(session, job.filename, job.path, limiter)
+
+            started = time.monotonic()
+            downloaded_bytes = 0
+            outcomes = run_download_queue(
+                download_jobs, download, state, args.download_workers, args.max_attempts
+            )
+            for done, outcome in enumerate(outcomes, start=1):
+                job = outcome.job
+                entry = entry_by_key[job.key]
+                record = record_by_path.get(job.path)
+                if outcome.error is None:
+                    assets.add(job.path)
+                    downloaded_bytes += job.path.stat().st_size
+                    if record:
+                        record["image_downloaded"] = True
+                        record["image_sha256"] = outcome.sha256
+                    retries = f", {outcome.attempts} intentos" if outcome.attempts > 1 else ""
+                    print(f"[{done}/{len(download_jobs)}] {job.path.name}{retries}")
+                else:
+                    failed_downloads.append((entry, outcome.error))
+                    without_image.append(entry)
+                    if record:
+                        record["image_filename"] = ""
+                        record["image_path"] = ""
+                        record["image_downloaded"] = False
+                        record["image_sha256"] = ""
+                    print(
+                        f"[WARN] Falló la descarga de {job.filename} ({entry.label}) "
+                        f"tras {outcome.attempts} intentos: {outcome.error}"
+                    )
+            elapsed = max(time.monotonic() - started, 1e-6)
             print(
-                f"Pendientes por descargar en otras ejecuciones ({len(pending_downloads)}). Usa más lotes para completarlas."
+                f"Imágenes descargadas: {len(download_jobs) - len(failed_downloads)} "
+                f"({downloaded_bytes / 1024 / 1024:.1f} MB en {elapsed:.1f} s)."
             )
+            if failed_downloads:
+                print("Las descargas fallidas se reintentarán en la próxima ejecución.")
 
         if records:
             write_outputs(records)
@@ -0,0 +1,37 @@
+from fetch_bmw_fasecolda_values import DetailCache
+
+
+def make_cache(codes: str) -> DetailCache:
+    cache = DetailCache(None)
+    cache.update({"BMW": list(codes)}, list(codes), [{"codigo": code} for code in codes])
+    return cache
+
+
+def layout(cache: DetailCache, codes: str) -> str:
+    return "".join(item["codigo"] for item in cache.items_for("BMW", list(codes)))
+
+
+def test_items_follow_the_last_full_run() -> None:
+    cache = make_cache("abcdx")
+    cache.record_order("BMW", [{"codigo": "b"}, {"codigo": "a"}, {"codigo": "b"}, {"codigo": ""}])
+    # Repeated codes stay repeated; unseen codes follow the code before them in `codes`.
+    assert layout(cache, "xacbd") == "xbdacb"
+
+
+def test_items_without_a_full_run_keep_code_order() -> None:
+    assert layout(make_cache("abc"), "cab") == "cab"
+
+
+def test_uncached_and_unlisted_codes_are_left_out() -> None:
+    cache = make_cache("ab")
+    cache.record_order("BMW", [{"codigo": "a"}, {"codigo": "b"}])
+    assert layout(cache, "bz") == "b"
+
+
+def test_removal_is_scoped_to_the_terms_of_the_run() -> None:
+    cache = DetailCache(None)
+    cache.update({"BMW": ["a", "b"]}, ["a", "b"], [{"codigo": "a"}, {"codigo": "b"}])
+    cache.update({"MINI": ["c"]}, ["c"], [{"codigo": "c"}])
+    changes = cache.update({"BMW": ["a"]}, [], [])
+    assert changes.removed == ["b"]
+    assert sorted(cache.entries) == ["a", "c"]
@@ -0,0 +1,47 @@
+from pathlib import Path
+
+import pytest
+
+from fasecolda_matcher import FasecoldaMatcher, features, has_model, model_word
+
+DATA_PATH = Path(__file__).resolve().parent.parent / "bmw_fasecolda_values.json"
+
+
+@pytest.fixture(scope="module")
+def matcher() -> FasecoldaMatcher:
+    return FasecoldaMatcher.load(DATA_PATH)
+
+
+@pytest.mark.parametrize(
+    ("text", "year", "codigo", "anio"),
+    [
+        # The Z4 shares "sDRIVE20i" as a whole word, but it is not an X1.
+        ("X1 sDrive20i", "2016", "00835005", "2016"),
+        # No 320i has a 2019 value: the F30 (until 2018) beats the E90 (until 2011).
+        ("Serie 3 320i", "2019", "00833216", "2018"),
+        ("320i", "2019", "00833216", "2018"),
+        ("X3 xDrive30e", "2021", "00836085", "2021"),
+        ("S1000RR", "2020", "00853011", "2020"),
+        ("R 1250 GS", "2021", "00854026", "2021"),
+    ],
+)
+def test_match(matcher: FasecoldaMatcher, text: str, year: str, codigo: str, anio: str) -> None:
+    match = matcher.match(text, year, brand="BMW")
+    assert match is not None
+    assert (match.codigo, match.anio) == (codigo, anio)
+
+
+def test_unknown_brand_is_rejected(matcher: FasecoldaMatcher) -> None:
+    assert matcher.match("Cooper S", "2018", brand="Renault") is None
+
+
+def test_model_word() -> None:
+    assert model_word("Serie 3 320i") == "320I"
+    assert model_word("X1 sDrive20i") == "X1"
+    assert model_word("R 1250 GS") is None
+
+
+def test_has_model_accepts_split_pieces() -> None:
+    reference = features("BMW S [K67] 1000 RR M MT 1000CC")
+    assert has_model(reference, "S1000RR")
+    assert not has_model(features("BMW Z4 E89 sDRIVE20i TP 2000CC"), "X1")
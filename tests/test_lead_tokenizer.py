@@ -0,0 +1,90 @@
+import random
+import re
+
+import pytest
+
+from import_leads_txt_to_sheet import (
+    CONTACT_LABELS,
+    LEAD_LABELS,
+    SEGMENT_LABELS,
+    tokenize_chunk,
+)
+
+
+def legacy_lead_pattern(segment_keys: tuple[str, ...]) -> re.Pattern[str]:
+    """Regex de cadena de grupos perezosos que usaba `parse_chunk` antes del tokenizador."""
+    body = "".join(
+        rf"{re.escape(LEAD_LABELS[key])}\s*(?P<{key}>.*?)\s*"
+        for key in (*segment_keys, *CONTACT_LABELS)
+    )
+    return re.compile(body + r"(?:City:\s*(?P<city>.*)\s*)?$", flags=re.IGNORECASE)
+
+
+LEGACY_LEAD_PATTERNS = {
+    segmento: legacy_lead_pattern(keys) for segmento, keys in SEGMENT_LABELS.items()
+}
+
+
+def tokenize_chunk_by_regexes(chunk: str) -> tuple[str, list[str]] | None:
+    for segmento, keys in SEGMENT_LABELS.items():
+        match = LEGACY_LEAD_PATTERNS[segmento].match(chunk)
+        if match:
+            values = [match.group(key).strip() for key in (*keys, *CONTACT_LABELS)]
+            if match.group("city") is not None:
+                values.append(match.group("city").strip())
+            return segmento, values
+    return None
+
+
+def random_lead_chunk(rng: random.Random) -> str:
+    """Lead sintético; uno de cada tres llega con etiquetas faltantes, repetidas o desordenadas."""
+    segment_keys = SEGMENT_LABELS["Carros" if rng.random() < 0.6 else "Motos"]
+    labels = [LEAD_LABELS[key] for key in (*segment_keys, *CONTACT_LABELS, "city")]
+    roll = rng.random()
+    if roll < 0.1:
+        labels.pop(rng.randrange(len(labels)))
+    elif roll < 0.15:
+        rng.shuffle(labels)
+    elif roll < 0.2:
+        labels.pop()
+    elif roll < 0.25:
+        labels.insert(rng.randrange(len(labels)), rng.choice(labels))
+    elif roll < 0.3:
+        labels = [label.upper() if rng.random() < 0.5 else label for label in labels]
+    elif roll < 0.33:
+        labels.insert(0, "ruido")
+    words = (
+        "BMW", "Sí", "3 meses", "X3 2021", "Email:", "City:", "cliente@x.com",
+        "Juan", "+57 300 123", "Bogotá", "  ", "—", "Full name:",
+    )
+    parts: list[str] = []
+    for label in labels:
+        parts.append(label)
+        parts.append(" ".join(rng.choice(words) for _ in range(rng.randint(0, 4))))
+    return " ".join(parts).strip()
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_tokenizer_matches_segment_regexes(seed: int) -> None:
+    rng = random.Random(seed)
+    for _ in range(5000):
+        chunk = random_lead_chunk(rng)
+        assert tokenize_chunk(chunk) == tokenize_chunk_by_regexes(chunk), chunk
+
+
+def test_tokenize_car_lead() -> None:
+    chunk = (
+        "¿Estas buscando un BMW o MINI COOPER?: BMW "
+        "¿Para cuando tienes proyectada tu compra?: 3 meses "
+        "¿Qué modelo y serie buscas?: X3 2021 "
+        "Email: cliente@x.com Full name: Juan Phone number: +57 300 123 City: Bogotá"
+    )
+    assert tokenize_chunk(chunk) == (
+        "Carros",
+        ["BMW", "3 meses", "X3 2021", "cliente@x.com", "Juan", "+57 300 123", "Bogotá"],
+    )
+
+
+def test_missing_label_is_rejected() -> None:
+    chunk = "¿Estas buscando moto de alto cilindraje?: Sí Email: a@b.co Full name: Ana Phone number: 1"
+    assert tokenize_chunk(chunk) is None
@@ -0,0 +1,42 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from import_leads_txt_to_sheet import ParsedLead, build_mercado_index, choose_advisor_from_mercado
+
+# Asesores esperados generados con el recorrido lineal que reemplazó el índice.
+FIXTURE_PATH = Path(__file__).resolve().parent / "fixtures" / "mercado_advisors.json"
+FIXTURE = json.loads(FIXTURE_PATH.read_text(encoding="utf-8"))
+
+
+def make_lead(brand: str, model: str) -> ParsedLead:
+    return ParsedLead(
+        segmento="carros",
+        respuesta_1=brand,
+        ventana_compra="",
+        modelo_serie=model,
+        email="",
+        nombre="",
+        telefono="",
+        ciudad="",
+    )
+
+
+@pytest.fixture(scope="module")
+def market_index():
+    return build_mercado_index([tuple(folder) for folder in FIXTURE["folders"]])
+
+
+@pytest.mark.parametrize(("brand", "model", "advisor"), FIXTURE["leads"])
+def test_index_matches_linear_scan(market_index, brand: str, model: str, advisor: str) -> None:
+    assert choose_advisor_from_mercado(make_lead(brand, model), market_index) == advisor
+
+
+def test_model_override_wins(market_index) -> None:
+    lead = make_lead("BMW", "Serie 4 420i Sportline 2020")
+    assert choose_advisor_from_mercado(lead, market_index) == "Marco"
+
+
+def test_empty_catalog_assigns_nobody() -> None:
+    assert choose_advisor_from_mercado(make_lead("BMW", "X1 2020"), build_mercado_index([])) == ""
@@ -0,0 +1,68 @@
+from typing import List
+
+import pytest
+
+import scrape_bmw_motorrad
+from scrape_bmw_motorrad import fetch_tipologia_items
+
+
+class FakeResponse:
+    def __init__(self, payload: dict) -> None:
+        self.payload = payload
+
+    def raise_for_status(self) -> None:
+        pass
+
+    def json(self) -> dict:
+        return self.payload
+
+
+class FakeSession:
+    """Serves `pages` by PageNumber, or always the first one when `ignore_page`."""
+
+    def __init__(self, pages: List[List[dict]], ignore_page: bool = False, **totals) -> None:
+        self.pages = pages
+        self.ignore_page = ignore_page
+        self.totals = totals
+        self.requested: List[int] = []
+
+    def get(self, url, params, headers, timeout) -> FakeResponse:
+        page = params["PageNumber"]
+        self.requested.append(page)
+        index = 0 if self.ignore_page else page - 1
+        items = self.pages[index] if index < len(self.pages) else []
+        return FakeResponse({"items": items, **self.totals})
+
+
+@pytest.fixture(autouse=True)
+def small_pages(monkeypatch) -> None:
+    monkeypatch.setattr(scrape_bmw_motorrad, "API_PAGE_SIZE", 3)
+
+
+def codes(items: List[dict]) -> List[str]:
+    return [item.get("codigo", "-") for item in items]
+
+
+def test_items_without_codigo_are_kept() -> None:
+    pages = [[{"codigo": "1"}, {}, {"codigo": "2"}], [{}, {"codigo": "2"}, {"codigo": "3"}], [{}]]
+    session = FakeSession(pages)
+    assert codes(fetch_tipologia_items(session, {}, 16)) == ["1", "-", "2", "-", "3", "-"]
+
+
+def test_ignored_page_number_stops_on_the_repeated_page() -> None:
+    session = FakeSession([[{"codigo": "1"}, {}, {"codigo": "2"}]], ignore_page=True)
+    assert codes(fetch_tipologia_items(session, {}, 16)) == ["1", "-", "2"]
+    assert session.requested == [1, 2]
+
+
+def test_ignored_page_number_without_codes_stops() -> None:
+    session = FakeSession([[{}, {}, {}]], ignore_page=True)
+    assert len(fetch_tipologia_items(session, {}, 16)) == 3
+    assert session.requested == [1, 2]
+
+
+def test_reported_total_decides_the_last_page() -> None:
+    pages = [[{"codigo": "1"}, {}, {"codigo": "2"}], [{"codigo": "3"}, {}, {}], [{"codigo": "4"}]]
+    session = FakeSession(pages, totalPages=2)
+    assert codes(fetch_tipologia_items(session, {}, 16)) == ["1", "-", "2", "3", "-", "-"]
+    assert session.requested == [1, 2]
@@ -0,0 +1,94 @@
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from scrape_bmw_motorrad import (
+    CATALOG_BLOCK_KEY,
+    HTML_CATALOG,
+    CatalogEntry,
+    parse_catalog_models,
+    read_catalog_models,
+)
+
+FIXTURE_PATH = Path(__file__).resolve().parent / "fixtures" / "motorrad_catalog.html"
+
+
+def parse_catalog_models_by_scan(content: str) -> List[CatalogEntry]:
+    """Character-by-character parser that `parse_catalog_models` replaced."""
+    start = content.index(CATALOG_BLOCK_KEY)
+    brace_start = content.index("{", start)
+    depth = 1
+    pos = brace_start + 1
+    while depth > 0 and pos < len(content):
+        char = content[pos]
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+        pos += 1
+    block = content[brace_start:pos]
+
+    entries: List[CatalogEntry] = []
+    idx = 0
+    order = 1
+    while True:
+        modelos_idx = block.find("modelos:", idx)
+        if modelos_idx == -1:
+            break
+        idx = block.find("[", modelos_idx)
+        if idx == -1:
+            break
+        idx += 1
+        depth = 1
+        inside_string = False
+        current = []
+        while idx < len(block) and depth > 0:
+            ch = block[idx]
+            if inside_string:
+                if ch == "'":
+                    inside_string = False
+                    label = "".join(current).strip()
+                    if label:
+                        entries.append(CatalogEntry(order=order, label=label))
+                        order += 1
+                    current = []
+                else:
+                    current.append(ch)
+            else:
+                if ch == "'":
+                    inside_string = True
+                elif ch == "[":
+                    depth += 1
+                elif ch == "]":
+                    depth -= 1
+            idx += 1
+    return entries
+
+
+@pytest.mark.parametrize("html_path", [FIXTURE_PATH, HTML_CATALOG], ids=["fixture", "registro"])
+def test_parser_matches_reference_scan(html_path: Path) -> None:
+    content = html_path.read_text(encoding="utf-8")
+    assert parse_catalog_models(content) == parse_catalog_models_by_scan(content)
+
+
+def test_fixture_catalog() -> None:
+    entries = parse_catalog_models(FIXTURE_PATH.read_text(encoding="utf-8"))
+    assert len(entries) == 134
+    assert entries[0] == CatalogEntry(order=1, label="BMW C 600 Sport AT 650CC")
+    assert entries[-1] == CatalogEntry(order=134, label="BMW S 1000R Dynamic MT 1000CC")
+    # Only the bmwMotorrad block is read, not the cars before it or the block after it.
+    assert not {"X1 sDrive18i", "No es Motorrad"} & {entry.label for entry in entries}
+
+
+def test_cached_catalog_is_reused_until_html_changes(tmp_path: Path) -> None:
+    html_path = tmp_path / "catalog.html"
+    cache_path = tmp_path / "cache.json"
+    content = FIXTURE_PATH.read_text(encoding="utf-8")
+    html_path.write_text(content, encoding="utf-8")
+    assert read_catalog_models(html_path, cache_path) == parse_catalog_models(content)
+    assert cache_path.exists()
+
+    edited = content.replace("BMW C 600 Sport AT 650CC", "BMW C 600 Sport 2026")
+    html_path.write_text(edited, encoding="utf-8")
+    assert read_catalog_models(html_path, cache_path)[0].label == "BMW C 600 Sport 2026"